@@ -1,7 +1,158 @@
+import time
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from embedding_cache import EmbeddingCache
 from grading_assistant import GradingAssistant
+from dedup import find_duplicates, grade_deduplicated
+from collusion import collusion_pairs, find_similar_submissions
+from cohort_view import (criteria_frame, criterion_histograms, grade_cohort, grade_distribution,
+                         page_count, read_submissions, results_table, table_page)
+
+INDIVIDUAL_MODE = "Individual responses"
+COHORT_MODE = "Large cohort (file upload)"
+
+@st.cache_resource
+def load_grader() -> GradingAssistant:
+    """Create one grader per server process; the model itself loads on first use"""
+    # Reruns, re-uploads and weight changes re-encode the same answers, so keep their embeddings
+    return GradingAssistant(embedding_cache=EmbeddingCache(max_entries=20000))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def grade_uploaded_cohort(data: bytes, file_name: str, reference_answer: str, assignment_type: str, model_name: str):
+    """Grade an uploaded cohort once; display changes rerun the script but hit this cache"""
+    submissions = read_submissions(data, file_name)
+    return submissions, grade_cohort(load_grader(), submissions, reference_answer, assignment_type)
+
+def render_cohort_mode(grader: GradingAssistant, assignment_type: str, show_detailed_scores: bool):
+    """Aggregated summary, paginated table and on-demand details for thousands of submissions"""
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        st.header("📋 Assignment Setup")
+        reference_answer = st.text_area(
+            "Reference Answer / Model Response",
+            placeholder="Enter the correct or model answer here...",
+            height=150
+        )
+    with col2:
+        st.header("📂 Submissions File")
+        upload = st.file_uploader(
+            "CSV or JSONL with an `answer` column (and optionally `student_id`)",
+            type=['csv', 'jsonl']
+        )
+    
+    if not reference_answer or upload is None:
+        st.info("Enter a reference answer and upload a submissions file to grade the cohort.")
+        return
+    
+    try:
+        with st.spinner("Grading cohort..."):
+            start = time.perf_counter()
+            submissions, results = grade_uploaded_cohort(
+                upload.getvalue(), upload.name, reference_answer, assignment_type, grader.model_name
+            )
+            grading_seconds = time.perf_counter() - start
+    except ValueError as e:
+        st.error(f"⚠️ {e}")
+        return
+    if len(results) == 0:
+        st.warning("The uploaded file has no submissions.")
+        return
+    
+    st.header("📊 Cohort Results")
+    st.caption(f"{len(results)} submissions ready in {grading_seconds:.2f}s (cached until the inputs change)")
+    grades = results.grades
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Average Grade", f"{grades.mean():.2f}/5")
+    with col2:
+        st.metric("Median Grade", f"{float(pd.Series(grades).median()):.1f}/5")
+    with col3:
+        st.metric("Below 3", f"{int((grades < 3).sum())}")
+    with col4:
+        st.metric("Total Responses", len(results))
+    
+    # One small figure per summary, whatever the cohort size
+    col1, col2 = st.columns(2)
+    with col1:
+        distribution = grade_distribution(results)
+        st.plotly_chart(px.bar(
+            x=distribution.index, y=distribution.values, title="Grade Distribution",
+            labels={'x': 'Grade', 'y': 'Number of Students'}
+        ), use_container_width=True)
+    with col2:
+        st.plotly_chart(px.bar(
+            criterion_histograms(results), x='score', y='students', color='criterion', barmode='overlay',
+            title="Criterion Score Distributions", labels={'score': 'Score', 'students': 'Number of Students'}
+        ), use_container_width=True)
+    
+    # Sortable, paginated results table
+    table = results_table(submissions, results)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        sort_by = st.selectbox("Sort by", list(table.columns), index=1)
+    with col2:
+        ascending = st.toggle("Ascending", value=True)
+    with col3:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+    with col4:
+        page = st.number_input("Page", min_value=1, max_value=page_count(len(table), page_size), value=1)
+    shown = table_page(table, sort_by, ascending, page, page_size)
+    selection = st.dataframe(
+        shown, hide_index=True, use_container_width=True,
+        on_select="rerun", selection_mode="single-row", key="cohort_table"
+    )
+    
+    # Details are built only for the selected submission
+    selected_rows = selection.selection.rows
+    if not selected_rows:
+        st.caption("Select a row to see that student's response, feedback and criteria breakdown.")
+        return
+    position = int(shown.index[selected_rows[0]])
+    st.subheader(f"📝 Student {submissions['student_id'][position]} - Grade: {int(grades[position])}/5")
+    st.markdown("**Student Response:**")
+    st.info(submissions['answer'][position])
+    st.markdown("**Feedback:**")
+    st.markdown(results.feedback(position))
+    if show_detailed_scores:
+        st.plotly_chart(px.bar(
+            criteria_frame(results, position), x='Criteria', y='Score', color='Score',
+            color_continuous_scale='RdYlGn', range_y=[0, 1], title="Criteria Breakdown"
+        ), use_container_width=True)
+
+def show_performance_statistics(grader: GradingAssistant):
+    """Instrumentation collected by the shared grader across all runs"""
+    with st.expander("📈 Performance Statistics"):
+        snapshot = grader.stats.snapshot()
+        if snapshot['stages']:
+            stage_df = pd.DataFrame([
+                {
+                    'Stage': stage,
+                    'Calls': histogram['count'],
+                    'Total (s)': round(histogram['sum'], 4),
+                    'Mean (ms)': round(histogram['mean'] * 1000, 3)
+                }
+                for stage, histogram in snapshot['stages'].items()
+            ])
+            st.dataframe(stage_df, hide_index=True)
+        else:
+            st.markdown("No grading has run yet.")
+        st.json(snapshot['counters'])
+        if grader.embedding_cache is not None:
+            cache_stats = grader.embedding_cache.stats()
+            st.markdown(
+                f"**Embedding cache:** {cache_stats['memory_entries']}/{cache_stats['max_entries']} entries, "
+                f"hit rate {cache_stats['hit_rate']:.1%} ({cache_stats['hits']} memory hits, "
+                f"{cache_stats['disk_hits']} disk hits, {cache_stats['misses']} misses, "
+                f"{cache_stats['evictions']} evictions)"
+            )
+        for event in snapshot['fallbacks']:
+            st.warning(f"Fell back to lexical similarity during **{event['stage']}**: {event['reason']}")
+        st.download_button(
+            "Download Prometheus metrics",
+            grader.stats.to_prometheus(),
+            file_name="grading_metrics.prom"
+        )
 
 def main():
     st.set_page_config(
@@ -17,6 +168,12 @@ def main():
     with st.sidebar:
         st.header("⚙️ Configuration")
         
+        mode = st.radio(
+            "Mode",
+            [INDIVIDUAL_MODE, COHORT_MODE],
+            help="Large cohort mode grades an uploaded file and shows an aggregated, paginated view"
+        )
+        
         assignment_type = st.selectbox(
             "Assignment Type",
             ["short_answer", "essay", "explanation", "analysis"],
@@ -29,6 +186,15 @@ def main():
             help="Display breakdown of individual criteria scores"
         )
         
+        collusion_threshold = st.slider(
+            "Similarity Alert Threshold",
+            min_value=0.5,
+            max_value=1.0,
+            value=0.85,
+            step=0.01,
+            help="Pairs of student responses at least this similar are flagged for review"
+        )
+        
         st.markdown("---")
         st.markdown("### 📊 Grading Criteria")
         st.markdown("""
@@ -38,8 +204,13 @@ def main():
         - **Structure (10%)**: Grammar, organization, and presentation
         """)
     
-    # Initialize grading assistant
-    grader = GradingAssistant()
+    # Reuse the grading assistant across reruns
+    grader = load_grader()
+    
+    if mode == COHORT_MODE:
+        render_cohort_mode(grader, assignment_type, show_detailed_scores)
+        show_performance_statistics(grader)
+        return
     
     # Main content area
     col1, col2 = st.columns([1, 1])
@@ -91,16 +262,47 @@ def main():
     if st.button("🔍 Grade Responses", type="primary", use_container_width=True):
         if reference_answer and all(answer.strip() for answer in student_answers):
             with st.spinner("Analyzing responses..."):
-                results = grader.grade_multiple_responses(
+                start = time.perf_counter()
+                # Identical answers are graded once and share the result
+                results, _ = grade_deduplicated(
+                    grader,
                     student_answers,
                     reference_answer,
-                    assignment_type
+                    assignment_type,
+                    columnar=True
                 )
+                grading_seconds = time.perf_counter() - start
             
             st.header("📊 Grading Results")
+            if grader.model_load_seconds is not None:
+                st.caption(
+                    f"Graded in {grading_seconds:.2f}s "
+                    f"(model load: {grader.model_load_seconds:.2f}s, once per server process)"
+                )
+            
+            # Flag identical or near-identical submissions for review
+            duplicate_groups = find_duplicates(student_answers, near=True).duplicate_groups()
+            if duplicate_groups:
+                st.warning("🔁 Possible duplicate answers: " + "; ".join(
+                    ", ".join(f"Student {i+1}" for i in group) for group in duplicate_groups
+                ))
+            
+            # Cross-submission similarity report
+            similar_pairs = collusion_pairs(
+                find_similar_submissions(grader, student_answers, threshold=collusion_threshold)
+            )
+            with st.expander(f"🕵️ Similar Submissions ({len(similar_pairs)} pairs)"):
+                if similar_pairs:
+                    st.dataframe(pd.DataFrame(
+                        [(f"Student {i+1}", f"Student {j+1}", round(similarity, 3))
+                         for i, j, similarity in similar_pairs],
+                        columns=['Student', 'Similar To', 'Similarity']
+                    ), hide_index=True)
+                else:
+                    st.markdown("No pairs of responses exceed the similarity threshold.")
             
             # Create summary statistics
-            grades = [result[0] for result in results]
+            grades = results.grades.tolist()
             avg_grade = sum(grades) / len(grades)
             
             # Summary metrics
@@ -188,6 +390,8 @@ def main():
         else:
             st.error("⚠️ Please provide a reference answer and ensure all student responses are filled in.")
 
+    show_performance_statistics(grader)
+
     # Help section
     with st.expander("❓ How to Use This Tool"):
         st.markdown("""
@@ -0,0 +1,269 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from embedding_backends import HashedNgramBackend
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA
+
+VOCABULARY = (
+    "the a of and to in is that it for as with on by this are be from or an which "
+    "energy cell cells plant plants light sun earth orbit gravity force mass water "
+    "temperature pressure reaction molecule atom electron protein enzyme membrane "
+    "photosynthesis respiration glucose oxygen carbon dioxide chlorophyll nucleus "
+    "theory evidence experiment hypothesis result data analysis conclusion because "
+    "therefore however process system structure function change growth population "
+    "market price demand supply economy policy government history revolution war"
+).split()
+
+LENGTHS = {
+    # (sentences, words per sentence) ranges
+    'short': ((1, 2), (6, 15)),
+    'essay': ((20, 35), (10, 25))
+}
+
+
+def make_corpus(size: int, length: str, seed: int = 0) -> List[str]:
+    """Generate a reproducible corpus of synthetic student answers"""
+    rng = random.Random(f"{seed}-{size}-{length}")
+    (min_sentences, max_sentences), (min_words, max_words) = LENGTHS[length]
+    answers = []
+    for _ in range(size):
+        sentences = []
+        for _ in range(rng.randint(min_sentences, max_sentences)):
+            words = rng.choices(VOCABULARY, k=rng.randint(min_words, max_words))
+            sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+        answers.append(" ".join(sentences))
+    return answers
+
+
+def make_grader(mode: str) -> GradingAssistant:
+    """A grader running the lexical fallback or the offline hashed n-gram backend"""
+    if mode == 'fallback':
+        grader = GradingAssistant()
+        grader.use_transformer = False
+    elif mode == 'embedder':
+        grader = GradingAssistant(backend=HashedNgramBackend())
+    else:
+        raise ValueError(f"Unknown benchmark mode: {mode}")
+    return grader
+
+
+def _cases(grader: GradingAssistant, answers: List[str], reference: str) -> Dict[str, Callable[[], None]]:
+    """Benchmarked callables; each processes the whole corpus once"""
+    return {
+        'calculate_similarity': lambda: [grader.calculate_similarity(a, reference) for a in answers],
+        '_cosine_similarity_fallback': lambda: [grader._cosine_similarity_fallback(a, reference) for a in answers],
+        '_assess_completeness': lambda: [grader._assess_completeness(a, reference) for a in answers],
+        '_assess_clarity': lambda: [grader._assess_clarity(a) for a in answers],
+        '_assess_structure': lambda: [grader._assess_structure(a) for a in answers],
+        'grade_response': lambda: [grader.grade_response(a, reference) for a in answers],
+        'grade_multiple_responses': lambda: grader.grade_multiple_responses(answers, reference)
+    }
+
+
+def run_benchmarks(sizes: List[int],
+                   lengths: List[str],
+                   modes: List[str],
+                   repeat: int = 3,
+                   cases: Optional[List[str]] = None,
+                   seed: int = 0) -> Dict[str, object]:
+    """Time every case on every corpus and return a JSON-serializable report"""
+    results = []
+    for mode in modes:
+        grader = make_grader(mode)
+        for length in lengths:
+            reference = make_corpus(1, length, seed=seed + 1)[0]
+            for size in sizes:
+                answers = make_corpus(size, length, seed=seed)
+                words = sum(len(answer.split()) for answer in answers)
+                for name, run in _cases(grader, answers, reference).items():
+                    if cases and name not in cases:
+                        continue
+                    # The fallback ignores the model, so it is only timed in fallback mode
+                    if mode == 'embedder' and name == '_cosine_similarity_fallback':
+                        continue
+                    timings = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        run()
+                        timings.append(time.perf_counter() - start)
+                    best = min(timings)
+                    results.append({
+                        'name': name,
+                        'mode': mode,
+                        'length': length,
+                        'size': size,
+                        'seconds_min': best,
+                        'seconds_median': statistics.median(timings),
+                        'answers_per_sec': size / best if best > 0 else float('inf'),
+                        'words_per_sec': words / best if best > 0 else float('inf')
+                    })
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'seed': seed
+        },
+        'results': results
+    }
+
+
+def throughput_by_length(report: Dict[str, object]) -> List[Dict[str, object]]:
+    """Short-answer and essay throughput side by side for every case, mode and size"""
+    rows: Dict[tuple, Dict[str, object]] = {}
+    for result in report['results']:
+        row = rows.setdefault(
+            (result['name'], result['mode'], result['size']),
+            {'name': result['name'], 'mode': result['mode'], 'size': result['size']}
+        )
+        row[f"{result['length']}_answers_per_sec"] = result['answers_per_sec']
+        row[f"{result['length']}_words_per_sec"] = result.get('words_per_sec')
+    return list(rows.values())
+
+
+def _per_answer_score_matrix(grader: GradingAssistant, answers: List[str], reference_answer: str) -> np.ndarray:
+    """Lexical criteria scores the way they were computed before interning: a TextFeatures per answer"""
+    reference = grader._analyze_all([reference_answer])[0]
+    students = grader._analyze_all(answers)
+    matrix = np.empty((len(students), len(CRITERIA)))
+    matrix[:, 0] = grader.calculate_similarities(answers, reference_answer, None, students, reference)
+    matrix[:, 1] = [grader._completeness_score(student, reference) for student in students]
+    matrix[:, 2] = [grader._clarity_score(student) for student in students]
+    matrix[:, 3] = [grader._structure_score(student) for student in students]
+    return matrix
+
+
+def lexical_memory_benchmark(size: int, length: str = 'short', seed: int = 0) -> Dict[str, object]:
+    """Peak traced memory and time of lexical scoring with and without token interning
+    
+    Each pipeline is timed once untraced, then run again under tracemalloc
+    for its peak; the corpus itself is allocated before tracing starts.
+    """
+    grader = make_grader('fallback')
+    answers = make_corpus(size, length, seed=seed)
+    reference = make_corpus(1, length, seed=seed + 1)[0]
+    pipelines = {
+        'per_answer': lambda: _per_answer_score_matrix(grader, answers, reference),
+        'interned': lambda: grader.score_matrix(answers, reference)
+    }
+    rows, matrices = {}, {}
+    for name, run in pipelines.items():
+        start = time.perf_counter()
+        matrices[name] = run()
+        seconds = time.perf_counter() - start
+        del matrices[name]
+        tracemalloc.start()
+        matrices[name] = run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows[name] = {'seconds': seconds, 'peak_bytes': peak, 'answers_per_sec': size / seconds if seconds > 0 else float('inf')}
+    return {
+        'size': size,
+        'length': length,
+        'pipelines': rows,
+        'identical_scores': bool(np.array_equal(matrices['per_answer'], matrices['interned'])),
+        'peak_reduction': 1 - rows['interned']['peak_bytes'] / rows['per_answer']['peak_bytes'],
+        'speedup': rows['per_answer']['seconds'] / rows['interned']['seconds']
+    }
+
+
+def _key(result: Dict[str, object]) -> tuple:
+    return result['name'], result['mode'], result['length'], result['size']
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object], tolerance: float = 0.2) -> List[str]:
+    """Describe every case that got slower than baseline by more than tolerance"""
+    previous = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(_key(result))
+        if old is None or old['seconds_min'] <= 0:
+            continue
+        ratio = result['seconds_min'] / old['seconds_min']
+        if ratio > 1 + tolerance:
+            name, mode, length, size = _key(result)
+            regressions.append(
+                f"{name} [{mode}, {length}, n={size}]: {old['seconds_min']:.4f}s -> "
+                f"{result['seconds_min']:.4f}s ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the grading hot paths on synthetic corpora")
+    parser.add_argument('--sizes', default="10,1000,100000", help="Comma-separated corpus sizes")
+    parser.add_argument('--lengths', default="short,essay", help="Comma-separated answer lengths (short, essay)")
+    parser.add_argument('--modes', default="fallback,embedder",
+                        help="Comma-separated modes: lexical fallback and/or offline hashed n-gram backend")
+    parser.add_argument('--cases', help="Comma-separated subset of benchmark names to run")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case; the minimum is reported")
+    parser.add_argument('-o', '--output', default="benchmark_results.json", help="Where to save the JSON report")
+    parser.add_argument('--compare', help="Baseline JSON report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument('--memory', type=int, metavar='SIZE',
+                        help="Instead, compare peak memory of lexical scoring with and without interning on SIZE answers")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.memory:
+        report = lexical_memory_benchmark(args.memory)
+        for name, row in report['pipelines'].items():
+            print(f"{name:<11} n={report['size']:<8} {row['seconds']:9.2f}s {row['answers_per_sec']:12.1f} answers/sec "
+                  f"peak {row['peak_bytes'] / 2 ** 20:10.1f} MiB")
+        print(f"Peak memory reduced by {report['peak_reduction']:.1%}, {report['speedup']:.2f}x faster, "
+              f"identical scores: {report['identical_scores']}")
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+        return 0 if report['identical_scores'] else 1
+
+    report = run_benchmarks(
+        sizes=[int(size) for size in args.sizes.split(',')],
+        lengths=args.lengths.split(','),
+        modes=args.modes.split(','),
+        repeat=args.repeat,
+        cases=args.cases.split(',') if args.cases else None
+    )
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for result in report['results']:
+        print(f"{result['name']:<28} {result['mode']:<9} {result['length']:<6} n={result['size']:<7} "
+              f"{result['seconds_min']:9.4f}s {result['answers_per_sec']:12.1f} answers/sec")
+    if len(set(result['length'] for result in report['results'])) > 1:
+        print("Throughput by answer length (answers/sec, words/sec):")
+        for row in throughput_by_length(report):
+            print(f"  {row['name']:<28} {row['mode']:<9} n={row['size']:<7} " + "  ".join(
+                f"{length} {row.get(f'{length}_answers_per_sec', 0):10.1f} /{row.get(f'{length}_words_per_sec') or 0:11.1f}"
+                for length in LENGTHS
+            ))
+    print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,409 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from collusion import collusion_pairs, find_similar_submissions
+from embedding_backends import DEFAULT_MODEL
+from embedding_cache import EmbeddingCache
+from file_formats import detect_format, read_rows
+from grading_assistant import GradingAssistant
+from grading_job import GradingJob, file_digest
+from reference_index import ReferenceIndex
+
+RESULT_FIELDS = [
+    'student_id', 'question_id', 'grade',
+    'content_accuracy', 'completeness', 'clarity', 'structure',
+    'feedback'
+]
+
+
+def load_references(path: str) -> Dict[str, str]:
+    """Load a question_id -> reference_answer mapping from CSV or JSONL"""
+    return {
+        str(row['question_id']): row['reference_answer']
+        for row in read_rows(path)
+    }
+
+
+def load_question_bank(path: str) -> Dict[str, List[str]]:
+    """Load question_id -> exemplar answers; repeated question_ids add exemplars"""
+    bank: Dict[str, List[str]] = {}
+    for row in read_rows(path):
+        bank.setdefault(str(row['question_id']), []).append(row['reference_answer'])
+    return bank
+
+
+def batched(rows: Iterable[Dict[str, str]], batch_size: int) -> Iterator[List[Dict[str, str]]]:
+    """Group a row stream into fixed-size micro-batches"""
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def grade_batch(grader: GradingAssistant,
+                batch: List[Dict[str, str]],
+                references: Dict[str, str],
+                default_reference: Optional[str] = None,
+                assignment_type: str = "short_answer",
+                workers: Optional[int] = None,
+                index: Optional[ReferenceIndex] = None) -> List[Dict[str, object]]:
+    """Grade one micro-batch, grouping answers by question so each reference is encoded once
+
+    Questions in index are scored against all of their exemplars in a
+    single pass over the batch.
+    """
+    by_question: Dict[str, List[int]] = {}
+    indexed: List[int] = []
+    for i, row in enumerate(batch):
+        question_id = str(row.get('question_id', ''))
+        if index is not None and question_id in index:
+            indexed.append(i)
+        else:
+            by_question.setdefault(question_id, []).append(i)
+
+    results: List[Optional[Dict[str, object]]] = [None] * len(batch)
+    if indexed:
+        graded = index.grade(
+            [str(batch[i].get('question_id', '')) for i in indexed],
+            [batch[i]['answer'] or '' for i in indexed]
+        )
+        for i, (grade, feedback, scores) in zip(indexed, graded):
+            results[i] = {
+                'student_id': batch[i].get('student_id', ''),
+                'question_id': str(batch[i].get('question_id', '')),
+                'grade': grade,
+                **scores,
+                'feedback': feedback
+            }
+    for question_id, positions in by_question.items():
+        reference = references.get(question_id, default_reference)
+        if reference is None:
+            raise ValueError(f"No reference answer for question '{question_id}'")
+        graded = grader.grade_multiple_responses(
+            [batch[i]['answer'] or '' for i in positions], reference, assignment_type, workers=workers
+        )
+        for i, (grade, feedback, scores) in zip(positions, graded):
+            results[i] = {
+                'student_id': batch[i].get('student_id', ''),
+                'question_id': question_id,
+                'grade': grade,
+                **scores,
+                'feedback': feedback
+            }
+    return results
+
+
+def grade_stream(grader: GradingAssistant,
+                 rows: Iterable[Dict[str, str]],
+                 references: Dict[str, str],
+                 default_reference: Optional[str] = None,
+                 batch_size: int = 256,
+                 assignment_type: str = "short_answer",
+                 workers: Optional[int] = None,
+                 index: Optional[ReferenceIndex] = None) -> Iterator[List[Dict[str, object]]]:
+    """Lazily grade a row stream, yielding one list of results per micro-batch"""
+    for batch in batched(rows, batch_size):
+        yield grade_batch(grader, batch, references, default_reference, assignment_type, workers, index)
+
+
+def collect_answers(rows: Iterable[Dict[str, str]],
+                    cohort: Dict[str, List[Tuple[str, str]]]) -> Iterator[Dict[str, str]]:
+    """Pass rows through while keeping (student_id, answer) per question for the collusion report"""
+    for row in rows:
+        cohort.setdefault(str(row.get('question_id', '')), []).append(
+            (str(row.get('student_id', '')), row.get('answer') or '')
+        )
+        yield row
+
+
+def write_collusion_report(grader: GradingAssistant,
+                           cohort: Dict[str, List[Tuple[str, str]]],
+                           path: str,
+                           threshold: float = 0.85,
+                           top_k: int = 5) -> int:
+    """Write suspiciously similar submission pairs per question to CSV, returning the pair count"""
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['question_id', 'student_id', 'similar_student_id', 'similarity'])
+        for question_id, submissions in cohort.items():
+            neighbors = find_similar_submissions(
+                grader, [answer for _, answer in submissions], threshold=threshold, top_k=top_k
+            )
+            for i, j, similarity in collusion_pairs(neighbors):
+                writer.writerow([question_id, submissions[i][0], submissions[j][0], f"{similarity:.4f}"])
+                count += 1
+    return count
+
+
+class ResultWriter(ABC):
+    """Incrementally write result batches to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @abstractmethod
+    def write(self, results: List[Dict[str, object]]):
+        """Append one batch of results"""
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CsvResultWriter(ResultWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS)
+        self._writer.writeheader()
+
+    def write(self, results: List[Dict[str, object]]):
+        self._writer.writerows(results)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlResultWriter(ResultWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, results: List[Dict[str, object]]):
+        self._file.writelines(json.dumps(result, ensure_ascii=False) + '\n' for result in results)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter(ResultWriter):
+    def __init__(self, path: str):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Writing Parquet requires pyarrow (pip install pyarrow)") from e
+        self._pa = pa
+        self._schema = pa.schema([
+            ('student_id', pa.string()),
+            ('question_id', pa.string()),
+            ('grade', pa.int8()),
+            ('content_accuracy', pa.float32()),
+            ('completeness', pa.float32()),
+            ('clarity', pa.float32()),
+            ('structure', pa.float32()),
+            ('feedback', pa.string())
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, results: List[Dict[str, object]]):
+        columns = {field: [result[field] for result in results] for field in RESULT_FIELDS}
+        columns['student_id'] = [str(value) for value in columns['student_id']]
+        self._writer.write_table(self._pa.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+_WRITERS = {
+    'csv': CsvResultWriter,
+    'jsonl': JsonlResultWriter,
+    'parquet': ParquetResultWriter
+}
+
+
+def open_writer(path: str, file_format: Optional[str] = None) -> ResultWriter:
+    """Open the result writer matching the output format"""
+    return _WRITERS[detect_format(path, file_format)](path)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Grade large CSV/JSONL exports of student submissions in streaming micro-batches"
+    )
+    parser.add_argument('input', help="Submissions file (.csv or .jsonl) with student_id, question_id, answer")
+    parser.add_argument('-o', '--output', required=True, help="Results file (.csv, .jsonl or .parquet)")
+    reference_group = parser.add_mutually_exclusive_group(required=True)
+    reference_group.add_argument('--reference', help="Reference answer used for every question")
+    reference_group.add_argument('--references',
+                                 help="File mapping question_id to reference_answer; "
+                                      "repeat a question_id to give it several exemplar answers")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'])
+    parser.add_argument('--output-format', choices=sorted(_WRITERS))
+    parser.add_argument('--batch-size', type=int, default=256, help="Answers graded per micro-batch")
+    parser.add_argument('--assignment-type', default="short_answer",
+                        choices=GradingAssistant.ASSIGNMENT_TYPES)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes used to grade each micro-batch")
+    parser.add_argument('--collusion-report',
+                        help="Also write pairs of suspiciously similar submissions to this CSV "
+                             "(keeps every answer in memory until the end of the run)")
+    parser.add_argument('--collusion-threshold', type=float, default=0.85,
+                        help="Minimum similarity reported as possible collusion")
+    parser.add_argument('--collusion-top-k', type=int, default=5,
+                        help="Nearest neighbours considered per submission")
+    parser.add_argument('--exemplar-top-k', type=int, default=1,
+                        help="With several exemplars, average the k best similarities (1 = best match)")
+    parser.add_argument('--checkpoint',
+                        help="Append-only checkpoint file; rerunning with the same file resumes the job")
+    parser.add_argument('--checkpoint-every', type=int, default=1000,
+                        help="Answers graded between checkpoint writes")
+    parser.add_argument('--restart', action='store_true',
+                        help="Discard an existing checkpoint and grade from the start")
+    parser.add_argument('--backend', default=DEFAULT_MODEL,
+                        help="Embedding backend: a sentence-transformers model, quantized:<path> or hashed")
+    parser.add_argument('--no-transformer', action='store_true',
+                        help="Skip the transformer model and use the lexical fallback")
+    parser.add_argument('--embedding-cache', metavar='PATH',
+                        help="SQLite file that keeps embeddings between runs")
+    parser.add_argument('--embedding-cache-size', type=int, default=10000,
+                        help="Embeddings kept in memory (least recently used are evicted)")
+    return parser
+
+
+def scorer_settings(grader: GradingAssistant) -> Dict[str, object]:
+    """The grader's current scorer, which can change mid-job when encoding falls back to lexical"""
+    # Load the model first so a load that fails is fingerprinted as lexical grading
+    transformer = grader.use_transformer and grader.model is not None
+    return {
+        'model': grader.model_name if transformer else 'lexical',
+        'max_chunk_words': grader.chunk_window() if transformer else None
+    }
+
+
+def job_fingerprint(args: argparse.Namespace, grader: GradingAssistant) -> Dict[str, object]:
+    """Every input and setting that changes results, so a checkpoint is only resumed under the same ones"""
+    return {
+        'references_sha256': file_digest(args.references) if args.references else None,
+        'reference': args.reference,
+        'assignment_type': args.assignment_type,
+        'exemplar_top_k': args.exemplar_top_k,
+        **scorer_settings(grader),
+        'weights': grader.feedback_criteria,
+        'thresholds': grader.feedback_thresholds
+    }
+
+
+def run_checkpointed_job(args: argparse.Namespace,
+                         grader: GradingAssistant,
+                         references: Dict[str, str],
+                         index: Optional[ReferenceIndex]) -> int:
+    """Grade through a resumable GradingJob, then write every checkpointed result; returns answers graded now"""
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    job = GradingJob(
+        args.input,
+        args.checkpoint,
+        lambda batch: grade_batch(grader, batch, references, args.reference,
+                                  args.assignment_type, args.workers, index),
+        detect_format(args.input, args.input_format),
+        batch_size=args.batch_size,
+        checkpoint_every=args.checkpoint_every,
+        fingerprint=job_fingerprint(args, grader),
+        current_settings=lambda: scorer_settings(grader)
+    )
+    graded = job.run()
+    if job.resumed_rows:
+        print(f"Resumed after {job.resumed_rows} answers from {args.checkpoint}", file=sys.stderr)
+    with open_writer(args.output, args.output_format) as writer:
+        for results in job.iter_results():
+            writer.write(results)
+    return graded
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.batch_size < 1:
+        print("Error: --batch-size must be at least 1", file=sys.stderr)
+        return 2
+    if args.embedding_cache_size < 1:
+        print("Error: --embedding-cache-size must be at least 1", file=sys.stderr)
+        return 2
+    if args.checkpoint:
+        try:
+            input_format = detect_format(args.input, args.input_format)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        if input_format not in ('csv', 'jsonl'):
+            print("Error: --checkpoint needs a CSV or JSONL input", file=sys.stderr)
+            return 2
+
+    cache = EmbeddingCache(max_entries=args.embedding_cache_size, path=args.embedding_cache)
+    grader = GradingAssistant(embedding_cache=cache, model_name=args.backend)
+    if args.no_transformer:
+        grader.use_transformer = False
+    references: Dict[str, str] = {}
+    index = None
+    if args.references:
+        bank = load_question_bank(args.references)
+        references = {question_id: exemplars[-1] for question_id, exemplars in bank.items()}
+        if any(len(exemplars) > 1 for exemplars in bank.values()):
+            index = ReferenceIndex(grader, bank, top_k=args.exemplar_top_k)
+
+    start = time.perf_counter()
+    graded = 0
+    rows = read_rows(args.input, args.input_format)
+    cohort: Dict[str, List[Tuple[str, str]]] = {}
+    if args.collusion_report and not args.checkpoint:
+        rows = collect_answers(rows, cohort)
+    try:
+        if args.checkpoint:
+            graded = run_checkpointed_job(args, grader, references, index)
+        else:
+            with open_writer(args.output, args.output_format) as writer:
+                for results in grade_stream(grader,
+                                            rows,
+                                            references,
+                                            default_reference=args.reference,
+                                            batch_size=args.batch_size,
+                                            assignment_type=args.assignment_type,
+                                            workers=args.workers,
+                                            index=index):
+                    writer.write(results)
+                    graded += len(results)
+        elapsed = time.perf_counter() - start
+        if args.collusion_report:
+            if args.checkpoint:
+                # A resumed job never saw the earlier answers, so read them all again
+                for _ in collect_answers(read_rows(args.input, args.input_format), cohort):
+                    pass
+            pairs = write_collusion_report(grader, cohort, args.collusion_report,
+                                           args.collusion_threshold, args.collusion_top_k)
+            print(f"Wrote {pairs} similar submission pairs to {args.collusion_report}", file=sys.stderr)
+    except (ValueError, KeyError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        grader.close()
+        cache.close()
+
+    rate = graded / elapsed if elapsed > 0 else float('inf')
+    print(f"Graded {graded} answers in {elapsed:.2f}s ({rate:.1f} answers/sec)", file=sys.stderr)
+    cache_stats = cache.stats()
+    if cache_stats['hits'] + cache_stats['disk_hits'] + cache_stats['misses']:
+        print(f"Embedding cache: {cache_stats['hit_rate']:.1%} hit rate ({cache_stats['hits']} memory hits, "
+              f"{cache_stats['disk_hits']} disk hits, {cache_stats['misses']} misses)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import io
+import json
+import math
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from dedup import grade_deduplicated
+from file_formats import detect_format
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA, GradingResults
+
+
+def read_submissions(data: bytes, file_name: str) -> pd.DataFrame:
+    """Parse an uploaded CSV or JSONL file with an answer column (student_id optional)"""
+    file_format = detect_format(file_name)
+    if file_format == 'csv':
+        submissions = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False)
+    elif file_format == 'jsonl':
+        rows = [json.loads(line) for line in data.decode('utf-8').splitlines() if line.strip()]
+        submissions = pd.DataFrame(rows)
+    else:
+        raise ValueError(f"Unsupported upload format: {file_format}")
+
+    if 'answer' not in submissions.columns:
+        raise ValueError("The uploaded file needs an 'answer' column")
+    if 'student_id' not in submissions.columns:
+        submissions['student_id'] = [str(i + 1) for i in range(len(submissions))]
+    submissions['answer'] = submissions['answer'].fillna('').astype(str)
+    submissions['student_id'] = submissions['student_id'].astype(str)
+    return submissions[['student_id', 'answer']].reset_index(drop=True)
+
+
+def grade_cohort(grader: GradingAssistant,
+                 submissions: pd.DataFrame,
+                 reference_answer: str,
+                 assignment_type: str = "short_answer") -> GradingResults:
+    """Grade a whole cohort into columnar results, scoring duplicate answers once"""
+    results, _ = grade_deduplicated(
+        grader, submissions['answer'].tolist(), reference_answer, assignment_type, columnar=True
+    )
+    return results
+
+
+def results_table(submissions: pd.DataFrame, results: GradingResults) -> pd.DataFrame:
+    """student_id, grade and criterion scores, one row per submission"""
+    table = results.to_pandas()
+    table.insert(0, 'student_id', submissions['student_id'].to_numpy())
+    return table
+
+
+def grade_distribution(results: GradingResults) -> pd.Series:
+    """Number of submissions at each grade from 0 to 5"""
+    return pd.Series(np.bincount(results.grades, minlength=6), index=range(6), name='students')
+
+
+def criterion_histograms(results: GradingResults, bins: int = 20) -> pd.DataFrame:
+    """Long-form histogram of every criterion score over [0, 1], a fixed bins rows per criterion
+
+    Scores outside [0, 1] (negative transformer cosines) are counted in the end bins.
+    """
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    frames = []
+    for criterion in CRITERIA:
+        counts, _ = np.histogram(np.clip(results.scores[criterion], 0.0, 1.0), bins=edges)
+        frames.append(pd.DataFrame({'criterion': criterion, 'score': edges[:-1], 'students': counts}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def page_count(rows: int, page_size: int) -> int:
+    return max(1, math.ceil(rows / page_size))
+
+
+def table_page(table: pd.DataFrame,
+               sort_by: str,
+               ascending: bool,
+               page: int,
+               page_size: int) -> pd.DataFrame:
+    """One page of the table after sorting; the index keeps each row's submission position"""
+    start = (page - 1) * page_size
+    return table.sort_values(sort_by, ascending=ascending, kind='stable').iloc[start:start + page_size]
+
+
+def criteria_frame(results: GradingResults, index: int) -> pd.DataFrame:
+    """Criterion scores of one submission, for its detail chart"""
+    scores = results.score_dict(index)
+    labels: List[str] = [criterion.replace('_', ' ').title() for criterion in CRITERIA]
+    return pd.DataFrame({'Criteria': labels, 'Score': [scores[criterion] for criterion in CRITERIA]})
@@ -0,0 +1,75 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from grading_assistant import GradingAssistant
+from lexical import LexicalVectorizer, iter_pairwise_similarities
+from text_analysis import tokenize
+
+Neighbor = Tuple[int, float]
+
+
+def _embedding_blocks(embeddings: np.ndarray, block_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (first_row, block) cosine similarity blocks of embeddings against themselves"""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    unit = np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+    for start in range(0, len(unit), block_size):
+        yield start, unit[start:start + block_size] @ unit.T
+
+
+def _similarity_blocks(grader: GradingAssistant,
+                       answers: Sequence[str],
+                       block_size: Optional[int]) -> Iterator[Tuple[int, np.ndarray]]:
+    """Similarity blocks from the transformer embeddings, or bag-of-words when unavailable"""
+    if grader.use_transformer and grader.model:
+        try:
+            embeddings = grader._encode(list(answers)).astype(np.float32)
+            # Cap each block at ~4M similarities regardless of cohort size
+            rows = block_size or max(1, (1 << 22) // len(answers))
+            return _embedding_blocks(embeddings, rows)
+        except Exception as e:
+            grader.fall_back_to_lexical(e)
+
+    matrix = LexicalVectorizer().transform([tokenize(answer) for answer in answers])
+    return iter_pairwise_similarities(matrix, block_size)
+
+
+def find_similar_submissions(grader: GradingAssistant,
+                             answers: Sequence[str],
+                             threshold: float = 0.85,
+                             top_k: int = 5,
+                             block_size: Optional[int] = None) -> List[List[Neighbor]]:
+    """Top-k most similar other submissions for each submission, above a threshold
+
+    Similarities are computed one row block at a time, so memory grows with
+    block_size x len(answers) rather than with the square of the cohort.
+    """
+    neighbors: List[List[Neighbor]] = [[] for _ in answers]
+    if len(answers) < 2 or top_k < 1:
+        return neighbors
+
+    k = min(top_k, len(answers) - 1)
+    for start, block in _similarity_blocks(grader, answers, block_size):
+        rows = np.arange(len(block))
+        block[rows, start + rows] = -np.inf  # a submission is not its own neighbour
+
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(block, candidates, axis=1)
+        for row, (columns, values) in enumerate(zip(candidates, scores)):
+            keep = values >= threshold
+            order = np.argsort(-values[keep], kind='stable')
+            neighbors[start + row] = [
+                (int(column), float(value))
+                for column, value in zip(columns[keep][order], values[keep][order])
+            ]
+    return neighbors
+
+
+def collusion_pairs(neighbors: List[List[Neighbor]]) -> List[Tuple[int, int, float]]:
+    """Unique (i, j, similarity) pairs from a neighbour list, most similar first"""
+    pairs = {}
+    for i, row in enumerate(neighbors):
+        for j, similarity in row:
+            key = (min(i, j), max(i, j))
+            pairs[key] = max(similarity, pairs.get(key, similarity))
+    return sorted(((i, j, s) for (i, j), s in pairs.items()), key=lambda pair: (-pair[2], pair[0], pair[1]))
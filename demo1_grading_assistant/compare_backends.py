@@ -0,0 +1,129 @@
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmark_grading import make_corpus
+from embedding_backends import DEFAULT_MODEL, create_backend
+from file_formats import read_rows
+from grading_assistant import GradingAssistant
+
+
+def _correlation(first: np.ndarray, second: np.ndarray) -> Optional[float]:
+    if len(first) < 2 or first.std() == 0 or second.std() == 0:
+        return None
+    return float(np.corrcoef(first, second)[0, 1])
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    # Tied values share their average rank, as Spearman's correlation requires
+    return pd.Series(values).rank().to_numpy()
+
+
+def run_backend(spec: str, answers: List[str], reference: str) -> Dict[str, object]:
+    """Grade answers with one backend, keeping its scores, grades, speed and size"""
+    backend = create_backend(spec)
+    grader = GradingAssistant(backend=backend)
+    start = time.perf_counter()
+    results = grader.grade_columnar(answers, reference)
+    seconds = time.perf_counter() - start
+    return {
+        'backend': spec,
+        'info': backend.info(),
+        'grading_seconds': seconds,
+        'answers_per_sec': len(answers) / seconds if seconds > 0 else float('inf'),
+        # A backend whose encode failed was silently replaced by the lexical fallback
+        'fell_back': not grader.use_transformer,
+        'content_accuracy': results.scores['content_accuracy'].astype(np.float64),
+        'grades': results.grades.astype(np.int64)
+    }
+
+
+def agreement(baseline: Dict[str, object], run: Dict[str, object]) -> Dict[str, object]:
+    """How closely one backend's content accuracy and grades follow the reference backend"""
+    expected, actual = baseline['content_accuracy'], run['content_accuracy']
+    grade_difference = np.abs(baseline['grades'] - run['grades'])
+    return {
+        'pearson': _correlation(expected, actual),
+        'spearman': _correlation(_ranks(expected), _ranks(actual)),
+        'mean_abs_difference': float(np.abs(expected - actual).mean()) if len(expected) else 0.0,
+        'grade_agreement': float((grade_difference == 0).mean()) if len(expected) else 1.0,
+        'grade_within_one': float((grade_difference <= 1).mean()) if len(expected) else 1.0
+    }
+
+
+def compare_backends(specs: List[str],
+                     reference_spec: str,
+                     answers: List[str],
+                     reference: str) -> List[Dict[str, object]]:
+    """Run every backend and score it against the reference backend"""
+    baseline = run_backend(reference_spec, answers, reference)
+    rows = []
+    for spec in [reference_spec] + [spec for spec in specs if spec != reference_spec]:
+        try:
+            run = baseline if spec == reference_spec else run_backend(spec, answers, reference)
+        except Exception as e:
+            rows.append({'backend': spec, 'error': str(e)})
+            continue
+        rows.append({
+            'backend': spec,
+            'answers_per_sec': run['answers_per_sec'],
+            'texts_per_sec': run['info']['texts_per_second'],
+            'memory_bytes': run['info']['memory_bytes'],
+            'dimension': run['info']['dimension'],
+            'fell_back': run['fell_back'],
+            **agreement(baseline, run)
+        })
+    return rows
+
+
+def load_answers(path: str) -> List[str]:
+    return [row.get('answer') or '' for row in read_rows(path)]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Compare embedding backends' throughput, size and scores against a reference backend"
+    )
+    parser.add_argument('--backends', default="hashed",
+                        help="Comma-separated backend specs, e.g. hashed,quantized:./models/minilm")
+    parser.add_argument('--reference-backend', default=DEFAULT_MODEL,
+                        help="Backend whose scores the others are compared against")
+    parser.add_argument('--input', help="CSV/JSONL file with an 'answer' column (default: synthetic corpus)")
+    parser.add_argument('--reference', help="Reference answer (default: a synthetic one)")
+    parser.add_argument('--size', type=int, default=1000, help="Synthetic corpus size")
+    parser.add_argument('--length', default='short', choices=['short', 'essay'], help="Synthetic answer length")
+    parser.add_argument('-o', '--output', help="Also save the comparison as JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    answers = load_answers(args.input) if args.input else make_corpus(args.size, args.length)
+    reference = args.reference or make_corpus(1, args.length, seed=1)[0]
+    try:
+        rows = compare_backends(args.backends.split(','), args.reference_backend, answers, reference)
+    except Exception as e:
+        print(f"Error: could not run reference backend '{args.reference_backend}' ({e})", file=sys.stderr)
+        return 1
+
+    for row in rows:
+        if 'error' in row:
+            print(f"{row['backend']:<32} failed: {row['error']}")
+            continue
+        spearman = f"{row['spearman']:.3f}" if row['spearman'] is not None else "n/a"
+        print(f"{row['backend']:<32} {row['answers_per_sec']:10.1f} answers/sec "
+              f"{row['memory_bytes'] / 2 ** 20:8.1f} MiB  spearman {spearman:>6}  "
+              f"grade agreement {row['grade_agreement']:.1%}" + ("  (fell back to lexical)" if row['fell_back'] else ""))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'answers': len(answers), 'reference_backend': args.reference_backend, 'backends': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
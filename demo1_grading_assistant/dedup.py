@@ -0,0 +1,174 @@
+import hashlib
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+import numpy as np
+
+from grading_assistant import GradingAssistant
+from grading_results import GradingResults
+from text_analysis import tokenize
+
+T = TypeVar('T')
+
+_WHITESPACE = re.compile(r'\s+')
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def normalize_answer(text: str) -> str:
+    """Collapse whitespace so trivially re-spaced answers hash the same"""
+    # Case and unicode form are kept: structure scoring looks at capitals and
+    # the tokenizer treats composed and decomposed accents differently, so
+    # only whitespace changes are guaranteed not to change any score
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+class DedupResult:
+    """Groups of duplicate answers; the first index of each group is its representative"""
+
+    def __init__(self, groups: List[List[int]], total: int):
+        self.groups = groups
+        self.total = total
+        self.group_of = [0] * total
+        for group_index, members in enumerate(groups):
+            for i in members:
+                self.group_of[i] = group_index
+
+    @property
+    def representatives(self) -> List[int]:
+        return [members[0] for members in self.groups]
+
+    @property
+    def saved(self) -> int:
+        """Number of answers that did not need to be scored"""
+        return self.total - len(self.groups)
+
+    def duplicate_groups(self) -> List[List[int]]:
+        """Groups with more than one member, for instructors to review"""
+        return [members for members in self.groups if len(members) > 1]
+
+    def expand(self, representative_results: Sequence[T]) -> List[T]:
+        """Fan one result per group back out to one result per answer"""
+        if isinstance(representative_results, GradingResults):
+            return representative_results[np.asarray(self.group_of, dtype=np.intp)]
+        return [representative_results[group] for group in self.group_of]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'total': self.total,
+            'unique': len(self.groups),
+            'saved': self.saved,
+            'saved_fraction': self.saved / self.total if self.total else 0.0,
+            'duplicate_groups': len(self.duplicate_groups())
+        }
+
+
+def _shingles(tokens: List[str], size: int) -> List[str]:
+    """Overlapping word n-grams; short answers become a single shingle"""
+    if len(tokens) <= size:
+        return [' '.join(tokens)] if tokens else []
+    return [' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+class MinHasher:
+    """MinHash signatures over word shingles for Jaccard-similarity estimates"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Signature of a text, or None when it has no tokens"""
+        shingles = _shingles(tokenize(text), self.shingle_size)
+        if not shingles:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+            dtype=np.uint64, count=len(shingles)
+        ) % _MERSENNE_PRIME
+        return ((self._a * hashes + self._b) % _MERSENNE_PRIME).min(axis=1)
+
+
+def find_duplicates(answers: Sequence[str],
+                    near: bool = False,
+                    threshold: float = 0.8,
+                    num_perm: int = 64,
+                    bands: int = 16,
+                    shingle_size: int = 3) -> DedupResult:
+    """Group identical answers, and optionally near-duplicates found with MinHash/LSH"""
+    # Exact duplicates: same hash of the normalized text
+    exact: Dict[bytes, List[int]] = {}
+    for i, answer in enumerate(answers):
+        digest = hashlib.blake2b(normalize_answer(answer).encode('utf-8'), digest_size=16).digest()
+        exact.setdefault(digest, []).append(i)
+    groups = list(exact.values())
+    if not near or len(groups) < 2:
+        return DedupResult(groups, len(answers))
+
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by bands")
+    rows_per_band = num_perm // bands
+
+    # Near duplicates: bucket signature bands, then confirm candidates by
+    # their estimated Jaccard similarity and merge with union-find
+    hasher = MinHasher(num_perm, shingle_size)
+    signatures = [hasher.signature(answers[members[0]]) for members in groups]
+    parent = list(range(len(groups)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    checked = set()
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = {}
+        for g, signature in enumerate(signatures):
+            if signature is not None:
+                key = signature[band * rows_per_band:(band + 1) * rows_per_band].tobytes()
+                buckets.setdefault(key, []).append(g)
+        for candidates in buckets.values():
+            first = candidates[0]
+            for other in candidates[1:]:
+                pair = (first, other)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+                estimate = float(np.mean(signatures[first] == signatures[other]))
+                if estimate >= threshold:
+                    parent[find(other)] = find(first)
+
+    merged: Dict[int, List[int]] = {}
+    for g, members in enumerate(groups):
+        merged.setdefault(find(g), []).extend(members)
+    return DedupResult([sorted(members) for members in merged.values()], len(answers))
+
+
+def grade_deduplicated(grader: GradingAssistant,
+                       student_answers: List[str],
+                       reference_answer: str,
+                       assignment_type: str = "short_answer",
+                       near: bool = False,
+                       threshold: float = 0.8,
+                       columnar: bool = False,
+                       **grading_options) -> Tuple[Union[List[Tuple[int, str, Dict[str, float]]], GradingResults], DedupResult]:
+    """Grade each group of duplicate answers once and fan the results back out
+
+    Exact groups only differ in whitespace, so their scores are identical to
+    grading every answer. Near-duplicate members receive their
+    representative's result. With columnar=True the results are a
+    GradingResults instead of a list of tuples.
+    """
+    dedup = find_duplicates(student_answers, near=near, threshold=threshold)
+    grade = grader.grade_columnar if columnar else grader.grade_multiple_responses
+    representative_results = grade(
+        [student_answers[i] for i in dedup.representatives],
+        reference_answer,
+        assignment_type,
+        **grading_options
+    )
+    return dedup.expand(representative_results), dedup
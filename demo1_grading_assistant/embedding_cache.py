@@ -0,0 +1,148 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache lookups without changing what the model sees"""
+    # Only unicode form and whitespace are normalized; case and punctuation
+    # are kept because they can change the embedding
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: a bounded in-memory LRU plus an optional SQLite file"""
+
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.path = path
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters used to size the cache
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """Build a cache key from the model name and a hash of the normalized text"""
+        digest = hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Insert into the memory tier, evicting the least recently used entries"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up embeddings for texts, returning None for every miss"""
+        keys = [self.make_key(model_name, text) for text in texts]
+        found: List[Optional[np.ndarray]] = [None] * len(keys)
+
+        with self._lock:
+            disk_lookups: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = vector
+                    self.hits += 1
+                elif self._db is not None:
+                    disk_lookups.setdefault(key, []).append(i)
+                else:
+                    self.misses += 1
+
+            if disk_lookups:
+                rows = {}
+                pending = list(disk_lookups)
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(pending), 500):
+                    chunk = pending[start:start + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows.update(
+                        (key, np.frombuffer(blob, dtype=np.float32, count=dim))
+                        for key, dim, blob in self._db.execute(
+                            f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})",
+                            chunk
+                        )
+                    )
+                for key, positions in disk_lookups.items():
+                    vector = rows.get(key)
+                    if vector is None:
+                        self.misses += len(positions)
+                        continue
+                    self._remember(key, vector)
+                    self.disk_hits += len(positions)
+                    for i in positions:
+                        found[i] = vector
+
+        return found
+
+    def put_many(self, model_name: str, texts: Sequence[str], vectors: Sequence[np.ndarray]):
+        """Store embeddings for texts in both tiers"""
+        with self._lock:
+            rows = []
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(model_name, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                rows.append((key, vector.shape[0], vector.tobytes()))
+
+            if self._db is not None and rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)", rows
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Get hit/miss/eviction counters and current size"""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'memory_entries': len(self._memory),
+            'max_entries': self.max_entries,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+    def clear(self):
+        """Drop every cached embedding from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def close(self):
+        """Close the on-disk tier"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
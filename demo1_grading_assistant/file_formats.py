@@ -0,0 +1,29 @@
+import csv
+import json
+import os
+from typing import Dict, Iterator, Optional
+
+
+def detect_format(path: str, explicit: Optional[str] = None) -> str:
+    """Work out a file format from an explicit choice or the file extension"""
+    if explicit:
+        return explicit
+    extension = os.path.splitext(path)[1].lower()
+    formats = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+    if extension not in formats:
+        raise ValueError(f"Cannot infer file format from '{path}'; use .csv, .jsonl or .parquet")
+    return formats[extension]
+
+
+def read_rows(path: str, file_format: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Stream rows from a CSV or JSONL file one at a time"""
+    file_format = detect_format(path, file_format)
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            yield from csv.DictReader(f)
+        elif file_format == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported input format: {file_format}")
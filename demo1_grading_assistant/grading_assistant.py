@@ -1,20 +1,131 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from typing import List, Tuple, Dict
-import re
+from typing import List, Tuple, Dict, Optional
 from collections import Counter
 import math
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from embedding_backends import DEFAULT_MODEL, EmbeddingBackend, create_backend
+from embedding_cache import EmbeddingCache
+from grading_results import CRITERIA, FEEDBACK_PHRASES, GradingResults
+from instrumentation import GradingStats
+from interning import InternedCorpus, TokenInterner
+from lexical import cosine_to_vector, similarities_to_reference
+from text_analysis import TextFeatures, analyze_text, split_chunks, tokenize
+
+# Process-wide registry so every grader (and every Streamlit rerun) shares one model
+_shared_models: Dict[str, object] = {}
+_failed_models: Dict[str, Exception] = {}
+_shared_models_lock = threading.Lock()
+
+
+def _create_model(model_name: str) -> EmbeddingBackend:
+    """Construct the embedding backend for a model name or backend spec"""
+    return create_backend(model_name)
+
+
+def get_shared_model(model_name: str):
+    """Get the process-wide model for model_name, loading it on first use"""
+    with _shared_models_lock:
+        if model_name in _failed_models:
+            raise _failed_models[model_name]
+        if model_name not in _shared_models:
+            try:
+                _shared_models[model_name] = _create_model(model_name)
+            except Exception as e:
+                # Remember the failure so later graders fall back immediately
+                _failed_models[model_name] = e
+                raise
+        return _shared_models[model_name]
+
+
+def clear_shared_models():
+    """Drop every shared model and remembered load failure"""
+    with _shared_models_lock:
+        _shared_models.clear()
+        _failed_models.clear()
+
+
+# Each pool worker builds its own grader once, in _init_worker
+_worker_grader: Optional["GradingAssistant"] = None
+
+
+def _init_worker(model: Optional[object] = None):
+    """Create the grader used by one worker process, with the parent's backend if it was passed"""
+    global _worker_grader
+    _worker_grader = GradingAssistant()
+    if model is not None:
+        _worker_grader.model = model
+
+
+Chunk = Tuple[Dict[str, object], List[str], str, str, Optional[int]]
+
+
+def _apply_settings(settings: Dict[str, object]):
+    # Settings travel with every chunk so a long-lived pool never grades with stale weights
+    for name, value in settings.items():
+        setattr(_worker_grader, name, value)
+
+
+def _check_worker_model(settings: Dict[str, object]):
+    """Fail the chunk when the worker cannot embed like the parent, so the parent grades serially"""
+    if settings['use_transformer'] and not (_worker_grader.use_transformer and _worker_grader.model is not None):
+        raise RuntimeError(f"Worker could not use embedding model '{settings['model_name']}'")
+
+
+def _grade_chunk(chunk: Chunk) -> List[Tuple[int, str, Dict[str, float]]]:
+    """Grade one shard of answers inside a worker process"""
+    settings, answers, reference_answer, assignment_type, batch_size = chunk
+    _apply_settings(settings)
+    _check_worker_model(settings)
+    results = _worker_grader.grade_multiple_responses(answers, reference_answer, assignment_type, batch_size)
+    _check_worker_model(settings)
+    return results
+
+
+def _score_chunk(chunk: Chunk) -> np.ndarray:
+    """Score matrix for one shard of answers inside a worker process"""
+    settings, answers, reference_answer, assignment_type, batch_size = chunk
+    _apply_settings(settings)
+    _check_worker_model(settings)
+    matrix = _worker_grader.score_matrix(answers, reference_answer, batch_size)
+    _check_worker_model(settings)
+    return matrix
+
+
+def cosine_to_reference(embeddings: np.ndarray, reference_embedding: np.ndarray) -> np.ndarray:
+    """Cosine of every embedding row to the reference, 0.0 where either vector is all zeros"""
+    denominator = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference_embedding)
+    return np.divide(
+        embeddings @ reference_embedding, denominator,
+        out=np.zeros(len(embeddings), dtype=np.result_type(embeddings, reference_embedding)),
+        where=denominator > 0
+    )
+
 
 class GradingAssistant:
-    def __init__(self):
-        # Try to initialize the BERT model for semantic similarity
-        try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.use_transformer = True
-        except Exception as e:
-            print(f"Warning: Could not load transformer model ({e}). Using fallback similarity method.")
-            self.model = None
-            self.use_transformer = False
+    ASSIGNMENT_TYPES = ["short_answer", "essay", "explanation", "analysis"]
+    
+    def __init__(self, 
+                 embedding_cache: Optional[EmbeddingCache] = None, 
+                 lazy: bool = True,
+                 stats: Optional[GradingStats] = None,
+                 model_name: str = DEFAULT_MODEL,
+                 backend: Optional[EmbeddingBackend] = None):
+        # Timings, counters and fallback events for every grading stage
+        self.stats = stats or GradingStats()
+        
+        # The embedding backend (a BERT model unless model_name names another
+        # backend, see create_backend) is loaded on the first similarity call
+        self.model_name = backend.name if backend is not None else model_name
+        self.embedding_cache = embedding_cache
+        self.use_transformer = True
+        self.model_load_seconds: Optional[float] = None
+        self._model = backend
+        self._model_loaded = backend is not None
+        if not lazy and backend is None:
+            self._load_model()
         
         # Define feedback criteria
         self.feedback_criteria = {
@@ -23,20 +134,63 @@ class GradingAssistant:
             'clarity': 0.2,
             'structure': 0.1
         }
+        
+        # Score cut-offs for positive (strong) and neutral (fair) feedback
+        self.feedback_thresholds = {
+            'strong': 0.8,
+            'fair': 0.6
+        }
+        
+        # Number of texts sent to the model per forward pass when grading in bulk
+        self.batch_size = 64
+        
+        # Longer texts are encoded in chunks of at most this many words and
+        # pooled, since MiniLM truncates its input. None takes the window from
+        # the backend (see chunk_window); 0 encodes texts whole
+        self.max_chunk_words: Optional[int] = None
+        
+        # Process pool for workers > 1, created on first use and reused between calls
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_workers = 0
+        self._pool_model: Optional[object] = None
+    
+    def _load_model(self):
+        """Try to attach the shared transformer model, falling back if it cannot load"""
+        start = time.perf_counter()
+        with self.stats.timer('model_load'):
+            try:
+                self._model = get_shared_model(self.model_name)
+            except Exception as e:
+                print(f"Warning: Could not load transformer model ({e}). Using fallback similarity method.")
+                self.stats.record_fallback('model_load', str(e))
+                self._model = None
+                self.use_transformer = False
+        self._model_loaded = True
+        self.model_load_seconds = time.perf_counter() - start
+    
+    @property
+    def model(self):
+        """The transformer model, loaded lazily on first access"""
+        if not self._model_loaded:
+            self._load_model()
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_loaded = True
     
     def _preprocess_text(self, text: str) -> List[str]:
         """Preprocess text for similarity calculation"""
-        # Convert to lowercase and remove punctuation
-        text = re.sub(r'[^\w\s]', '', text.lower())
-        # Split into words
-        words = text.split()
-        return words
+        # Convert to lowercase, remove punctuation and split into words
+        return tokenize(text)
     
     def _cosine_similarity_fallback(self, text1: str, text2: str) -> float:
         """Calculate cosine similarity using word frequency vectors"""
-        words1 = self._preprocess_text(text1)
-        words2 = self._preprocess_text(text2)
-        
+        return self._token_cosine_similarity(self._preprocess_text(text1), self._preprocess_text(text2))
+    
+    def _token_cosine_similarity(self, words1: List[str], words2: List[str]) -> float:
+        """Calculate cosine similarity of two preprocessed word lists"""
         # Create word frequency counters
         counter1 = Counter(words1)
         counter2 = Counter(words2)
@@ -61,46 +215,183 @@ class GradingAssistant:
         
         return dot_product / (norm1 * norm2)
         
+    def _model_encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Run one model encode call, recording its time and batch size"""
+        with self.stats.timer('encode'):
+            embeddings = np.asarray(self.model.encode(texts, batch_size=batch_size))
+        self.stats.observe_batch(len(texts))
+        return embeddings
+    
+    def fall_back_to_lexical(self, error: Exception):
+        """Warn, record the switch and use the lexical fallback from now on after an encode failure"""
+        print(f"Warning: Transformer model failed ({error}). Falling back to basic similarity.")
+        self.stats.record_fallback('encode', str(error))
+        self.use_transformer = False
+    
+    def chunk_window(self) -> Optional[int]:
+        """Words per encoded chunk, or None when texts are encoded whole"""
+        if self.max_chunk_words is not None:
+            return self.max_chunk_words or None
+        return getattr(self.model, 'max_words', None)
+    
+    def _encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode texts into one vector each, chunking and pooling texts that are too long"""
+        max_words = self.chunk_window()
+        if not max_words:
+            return self._encode_texts(texts, batch_size)
+        chunked = [split_chunks(text, max_words) for text in texts]
+        if all(len(chunks) == 1 for chunks in chunked):
+            return self._encode_texts(texts, batch_size)
+        
+        counts = np.fromiter(map(len, chunked), dtype=np.int64, count=len(chunked))
+        self.stats.increment('texts_chunked', int(np.count_nonzero(counts > 1)))
+        chunks = [chunk for text_chunks in chunked for chunk in text_chunks]
+        # A blank text has no words but still one chunk, so every weight is at least 1
+        weights = np.array([max(len(chunk.split()), 1) for chunk in chunks], dtype=np.float64)
+        
+        # Sorting by length means every model batch holds chunks of similar
+        # length, so little compute is wasted on padding
+        order = np.argsort(weights, kind='stable')
+        encoded = self._encode_texts([chunks[i] for i in order.tolist()], batch_size)
+        embeddings = np.empty_like(encoded, dtype=np.float64)
+        embeddings[order] = encoded
+        
+        # Length-weighted mean of each text's chunk vectors
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        pooled = np.add.reduceat(embeddings * weights[:, None], starts, axis=0)
+        pooled /= np.add.reduceat(weights, starts)[:, None]
+        # Texts that fit in one chunk keep their exact embedding, whatever else is in the call
+        single = counts == 1
+        pooled[single] = embeddings[starts[single]]
+        return pooled
+    
+    def _encode_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode texts with the model, serving repeated texts from the embedding cache"""
+        batch_size = batch_size or self.batch_size
+        if self.embedding_cache is None:
+            return self._model_encode(texts, batch_size)
+        
+        embeddings = self.embedding_cache.get_many(self.model_name, texts)
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+        if missing:
+            encoded = self._model_encode(missing, batch_size).astype(np.float32)
+            self.embedding_cache.put_many(self.model_name, missing, encoded)
+            by_text = dict(zip(missing, encoded))
+            embeddings = [
+                by_text[text] if embedding is None else embedding
+                for text, embedding in zip(texts, embeddings)
+            ]
+        return np.vstack(embeddings)
+        
     def calculate_similarity(self, text1: str, text2: str) -> float:
         # Calculate semantic similarity between two texts
         if self.use_transformer and self.model:
             try:
-                embeddings = self.model.encode([text1, text2])
-                similarity = np.dot(embeddings[0], embeddings[1]) / (
-                    np.linalg.norm(embeddings[0]) * np.linalg.norm(embeddings[1])
-                )
-                return float(similarity)
+                embeddings = self._encode([text1, text2])
+                return float(cosine_to_reference(embeddings[:1], embeddings[1])[0])
             except Exception as e:
-                print(f"Warning: Transformer model failed ({e}). Falling back to basic similarity.")
-                self.use_transformer = False
+                self.fall_back_to_lexical(e)
         
         # Use fallback method
-        return self._cosine_similarity_fallback(text1, text2)
+        with self.stats.timer('lexical_similarity'):
+            return self._cosine_similarity_fallback(text1, text2)
+
+    def calculate_similarities(self, 
+                               texts: List[str], 
+                               reference: str,
+                               batch_size: Optional[int] = None,
+                               features: Optional[List[TextFeatures]] = None,
+                               reference_features: Optional[TextFeatures] = None) -> List[float]:
+        """Calculate the similarity of every text to one reference in a single batched pass"""
+        if not texts:
+            return []
+        
+        similarities = self._transformer_similarities(texts, reference, batch_size)
+        if similarities is not None:
+            return [float(similarity) for similarity in similarities]
+        
+        # Use the vectorized equivalent of the fallback method
+        if features is None:
+            features = self._analyze_all(texts)
+        if reference_features is None:
+            reference_features = self._analyze_all([reference])[0]
+        with self.stats.timer('lexical_similarity'):
+            similarities = similarities_to_reference(
+                [feature.tokens for feature in features],
+                reference_features.tokens
+            )
+        return similarities.tolist()
+    
+    def _transformer_similarities(self, 
+                                  texts: List[str], 
+                                  reference: str,
+                                  batch_size: Optional[int] = None) -> Optional[np.ndarray]:
+        """Embedding similarity of every text to the reference, or None to use the fallback"""
+        if not (self.use_transformer and self.model):
+            return None
+        try:
+            # Encode the reference once and all texts together, then score
+            # every text with one matrix-vector product
+            reference_embedding = self._encode([reference])[0]
+            embeddings = self._encode(list(texts), batch_size)
+            return cosine_to_reference(embeddings, reference_embedding)
+        except Exception as e:
+            self.fall_back_to_lexical(e)
+            return None
+    
+    def _analyze_corpus(self, texts: List[str], interner: TokenInterner) -> InternedCorpus:
+        """Analyze texts into interned token ids and statistic columns, recording time and token counts"""
+        with self.stats.timer('analyze'):
+            corpus = InternedCorpus.build(texts, interner)
+        self.stats.increment('texts_analyzed', len(corpus))
+        self.stats.increment('tokens_processed', int(corpus.token_counts.sum()))
+        return corpus
+    
+    def _analyze_all(self, texts: List[str]) -> List[TextFeatures]:
+        """Analyze texts, recording analysis time and token counts"""
+        with self.stats.timer('analyze'):
+            features = [analyze_text(text) for text in texts]
+        self.stats.increment('texts_analyzed', len(features))
+        self.stats.increment('tokens_processed', sum(len(feature.tokens) for feature in features))
+        return features
     
     def _assess_completeness(self, student_answer: str, reference_answer: str) -> float:
         """Assess how complete the student answer is compared to reference"""
-        student_words = set(self._preprocess_text(student_answer))
-        reference_words = set(self._preprocess_text(reference_answer))
-        
-        if not reference_words:
-            return 1.0
-        
-        coverage = len(student_words.intersection(reference_words)) / len(reference_words)
-        return min(coverage * 1.5, 1.0)  # Give some bonus for good coverage
+        return self._completeness_score(analyze_text(student_answer), analyze_text(reference_answer))
     
     def _assess_clarity(self, student_answer: str) -> float:
         """Assess clarity based on sentence structure and length"""
-        if not student_answer.strip():
-            return 0.0
-        
-        sentences = re.split(r'[.!?]+', student_answer)
-        sentences = [s.strip() for s in sentences if s.strip()]
+        return self._clarity_score(analyze_text(student_answer))
+    
+    def _assess_structure(self, student_answer: str) -> float:
+        """Assess structural quality of the answer"""
+        return self._structure_score(analyze_text(student_answer))
+    
+    def _completeness_score(self, student: TextFeatures, reference: TextFeatures) -> float:
+        """Score completeness from analyzed student and reference texts"""
+        if not reference.token_set:
+            return 1.0
         
-        if not sentences:
+        coverage = len(student.token_set & reference.token_set) / len(reference.token_set)
+        return min(coverage * 1.5, 1.0)  # Give some bonus for good coverage
+    
+    def _completeness_scores(self, students: InternedCorpus, reference: InternedCorpus) -> np.ndarray:
+        """_completeness_score for every text of a corpus, via sorted id intersections"""
+        reference_ids = reference.row_ids(0)
+        if len(reference_ids) == 0:
+            return np.ones(len(students))
+        coverage = students.overlap_counts(reference_ids) / len(reference_ids)
+        return np.minimum(coverage * 1.5, 1.0)
+    
+    def _clarity_score(self, student: TextFeatures) -> float:
+        """Score clarity from an analyzed student text"""
+        if student.is_blank or not student.sentence_lengths:
             return 0.0
         
         # Assess based on average sentence length and number of sentences
-        avg_length = sum(len(s.split()) for s in sentences) / len(sentences)
+        avg_length = sum(student.sentence_lengths) / len(student.sentence_lengths)
         
         # Optimal sentence length is around 15-20 words
         if 10 <= avg_length <= 25:
@@ -114,79 +405,64 @@ class GradingAssistant:
         
         return clarity_score
     
-    def _assess_structure(self, student_answer: str) -> float:
-        """Assess structural quality of the answer"""
-        if not student_answer.strip():
+    def _clarity_scores(self, students: InternedCorpus) -> np.ndarray:
+        """_clarity_score for every text of a corpus"""
+        counts = students.sentence_counts
+        avg_length = np.divide(students.sentence_words, counts, out=np.zeros(len(students)), where=counts > 0)
+        scores = np.select(
+            [(10 <= avg_length) & (avg_length <= 25), avg_length < 5, avg_length > 40],
+            [1.0, 0.4, 0.6],
+            0.8
+        )
+        return np.where((students.word_counts == 0) | (counts == 0), 0.0, scores)
+    
+    def _structure_score(self, student: TextFeatures) -> float:
+        """Score structural quality from an analyzed student text"""
+        if student.is_blank:
             return 0.0
         
         # Check for basic structural elements
-        has_punctuation = bool(re.search(r'[.!?]', student_answer))
-        has_capitalization = bool(re.search(r'[A-Z]', student_answer))
-        word_count = len(student_answer.split())
-        
         structure_score = 0.0
-        if has_punctuation:
+        if student.has_punctuation:
             structure_score += 0.4
-        if has_capitalization:
+        if student.has_capital:
             structure_score += 0.3
-        if word_count >= 10:  # Adequate length
+        if student.word_count >= 10:  # Adequate length
             structure_score += 0.3
         
         return structure_score
 
+    def _structure_scores(self, students: InternedCorpus) -> np.ndarray:
+        """_structure_score for every text of a corpus, adding the parts in the same order"""
+        scores = np.where(students.has_punctuation, 0.4, 0.0)
+        scores = scores + np.where(students.has_capital, 0.3, 0.0)
+        scores = scores + np.where(students.word_counts >= 10, 0.3, 0.0)
+        return np.where(students.word_counts == 0, 0.0, scores)
+    
     def generate_detailed_feedback(self, scores: Dict[str, float]) -> str:
         """Generate detailed feedback based on criteria scores"""
+        strong = self.feedback_thresholds['strong']
+        fair = self.feedback_thresholds['fair']
         feedback_parts = []
-        
-        if scores['content_accuracy'] >= 0.8:
-            feedback_parts.append("✓ Excellent content accuracy")
-        elif scores['content_accuracy'] >= 0.6:
-            feedback_parts.append("• Good content accuracy, but could be more precise")
-        else:
-            feedback_parts.append("⚠ Content accuracy needs improvement")
-        
-        if scores['completeness'] >= 0.8:
-            feedback_parts.append("✓ Comprehensive answer")
-        elif scores['completeness'] >= 0.6:
-            feedback_parts.append("• Answer is somewhat complete, consider adding more details")
-        else:
-            feedback_parts.append("⚠ Answer is incomplete, missing key elements")
-        
-        if scores['clarity'] >= 0.8:
-            feedback_parts.append("✓ Clear and well-expressed")
-        elif scores['clarity'] >= 0.6:
-            feedback_parts.append("• Generally clear, but could be more concise")
-        else:
-            feedback_parts.append("⚠ Clarity needs improvement - consider restructuring")
-        
-        if scores['structure'] >= 0.8:
-            feedback_parts.append("✓ Well-structured response")
-        elif scores['structure'] >= 0.6:
-            feedback_parts.append("• Decent structure, minor improvements needed")
-        else:
-            feedback_parts.append("⚠ Structure needs work - check grammar and organization")
-        
+        for criterion in CRITERIA:
+            tier = 0 if scores[criterion] >= strong else 1 if scores[criterion] >= fair else 2
+            feedback_parts.append(FEEDBACK_PHRASES[criterion][tier])
         return "\n".join(feedback_parts)
 
-    def grade_response(self, 
-                      student_answer: str, 
-                      reference_answer: str,
-                      assignment_type: str = "short_answer") -> Tuple[int, str, Dict[str, float]]:
-        """Grade a student response with detailed feedback"""
-        
-        # Calculate individual criteria scores
-        content_accuracy = self.calculate_similarity(student_answer, reference_answer)
-        completeness = self._assess_completeness(student_answer, reference_answer)
-        clarity = self._assess_clarity(student_answer)
-        structure = self._assess_structure(student_answer)
-        
-        scores = {
+    def _score_response(self, 
+                        student: TextFeatures, 
+                        reference: TextFeatures,
+                        content_accuracy: float) -> Dict[str, float]:
+        """Calculate individual criteria scores from analyzed texts and a content accuracy"""
+        return {
             'content_accuracy': content_accuracy,
-            'completeness': completeness,
-            'clarity': clarity,
-            'structure': structure
+            'completeness': self._completeness_score(student, reference),
+            'clarity': self._clarity_score(student),
+            'structure': self._structure_score(student)
         }
-        
+    
+    def _build_result(self, scores: Dict[str, float]) -> Tuple[int, str, Dict[str, float]]:
+        """Turn criteria scores into a grade and detailed feedback"""
         # Calculate weighted overall score
         overall_score = sum(scores[criterion] * weight 
                           for criterion, weight in self.feedback_criteria.items())
@@ -199,17 +475,180 @@ class GradingAssistant:
         detailed_feedback = self.generate_detailed_feedback(scores)
         
         return grade, detailed_feedback, scores
+
+    def grade_response(self, 
+                      student_answer: str, 
+                      reference_answer: str,
+                      assignment_type: str = "short_answer") -> Tuple[int, str, Dict[str, float]]:
+        """Grade a student response with detailed feedback"""
+        student, reference = self._analyze_all([student_answer, reference_answer])
+        if self.use_transformer and self.model:
+            content_accuracy = self.calculate_similarity(student_answer, reference_answer)
+        else:
+            with self.stats.timer('lexical_similarity'):
+                content_accuracy = self._token_cosine_similarity(student.tokens, reference.tokens)
+        with self.stats.timer('assess'):
+            result = self._build_result(self._score_response(student, reference, content_accuracy))
+        self.stats.increment('texts_graded')
+        return result
     
     def grade_multiple_responses(self, 
                                student_answers: List[str], 
                                reference_answer: str,
-                               assignment_type: str = "short_answer") -> List[Tuple[int, str, Dict[str, float]]]:
-        """Grade multiple student responses"""
-        return [
-            self.grade_response(answer, reference_answer, assignment_type) 
-            for answer in student_answers
+                               assignment_type: str = "short_answer",
+                               batch_size: Optional[int] = None,
+                               workers: Optional[int] = None) -> List[Tuple[int, str, Dict[str, float]]]:
+        """Grade multiple student responses, encoding them in batches
+        
+        With workers > 1 the answers are sharded across a process pool; results
+        always come back in input order and match the serial path.
+        """
+        if workers and workers > 1 and len(student_answers) > 1:
+            # Stage timings inside worker processes stay in the workers
+            with self.stats.timer('parallel_grading'):
+                results = self._grade_in_processes(
+                    student_answers, reference_answer, assignment_type, batch_size, workers
+                )
+        else:
+            results = self._grade_serial(student_answers, reference_answer, batch_size)
+        self.stats.increment('texts_graded', len(results))
+        return results
+    
+    def _grade_serial(self, 
+                      student_answers: List[str], 
+                      reference_answer: str,
+                      batch_size: Optional[int]) -> List[Tuple[int, str, Dict[str, float]]]:
+        """Grade answers in this process with one batched similarity pass"""
+        matrix = self.score_matrix(student_answers, reference_answer, batch_size)
+        with self.stats.timer('assess'):
+            return [self._build_result(dict(zip(CRITERIA, row))) for row in matrix.tolist()]
+    
+    def score_matrix(self, 
+                     student_answers: List[str], 
+                     reference_answer: str,
+                     batch_size: Optional[int] = None) -> np.ndarray:
+        """Criteria scores of every answer as a (len(answers), len(CRITERIA)) array
+        
+        Answers are analyzed into one interned corpus, so no per-answer token
+        lists or sets are kept while scoring.
+        """
+        # Analyze the reference once and every answer exactly once
+        interner = TokenInterner()
+        reference = self._analyze_corpus([reference_answer], interner)
+        students = self._analyze_corpus(student_answers, interner)
+        matrix = np.empty((len(students), len(CRITERIA)))
+        if not len(students):
+            return matrix
+        
+        similarities = self._transformer_similarities(student_answers, reference_answer, batch_size)
+        if similarities is None:
+            with self.stats.timer('lexical_similarity'):
+                similarities = cosine_to_vector(students.term_matrix(), reference.dense_counts(0))
+        with self.stats.timer('assess'):
+            matrix[:, 0] = similarities
+            matrix[:, 1] = self._completeness_scores(students, reference)
+            matrix[:, 2] = self._clarity_scores(students)
+            matrix[:, 3] = self._structure_scores(students)
+        return matrix
+    
+    def grade_columnar(self, 
+                       student_answers: List[str], 
+                       reference_answer: str,
+                       assignment_type: str = "short_answer",
+                       batch_size: Optional[int] = None,
+                       workers: Optional[int] = None) -> GradingResults:
+        """Grade multiple responses into NumPy columns instead of per-answer tuples
+        
+        Grades and feedback match grade_multiple_responses; scores are float32.
+        """
+        matrix = None
+        if workers and workers > 1 and len(student_answers) > 1:
+            with self.stats.timer('parallel_grading'):
+                chunks = self._map_in_processes(
+                    _score_chunk, student_answers, reference_answer, assignment_type, batch_size, workers
+                )
+            if chunks is not None:
+                matrix = np.concatenate(chunks)
+        if matrix is None:
+            matrix = self.score_matrix(student_answers, reference_answer, batch_size)
+        self.stats.increment('texts_graded', len(matrix))
+        return GradingResults.from_scores(matrix, self.feedback_criteria, self.feedback_thresholds)
+    
+    def _grade_in_processes(self, 
+                            student_answers: List[str], 
+                            reference_answer: str,
+                            assignment_type: str,
+                            batch_size: Optional[int],
+                            workers: int) -> List[Tuple[int, str, Dict[str, float]]]:
+        """Grade answers across a process pool, falling back to serial grading if it fails"""
+        chunks = self._map_in_processes(
+            _grade_chunk, student_answers, reference_answer, assignment_type, batch_size, workers
+        )
+        if chunks is None:
+            return self._grade_serial(student_answers, reference_answer, batch_size)
+        return [result for chunk in chunks for result in chunk]
+    
+    def _map_in_processes(self, 
+                          function, 
+                          student_answers: List[str], 
+                          reference_answer: str,
+                          assignment_type: str,
+                          batch_size: Optional[int],
+                          workers: int) -> Optional[list]:
+        """Run function over shards of the answers in the pool; None if the pool fails"""
+        # A few chunks per worker keeps the pool busy when chunk costs differ
+        chunk_size = max(1, math.ceil(len(student_answers) / (workers * 4)))
+        settings = {
+            'model_name': self.model_name,
+            'use_transformer': self.use_transformer,
+            'feedback_criteria': dict(self.feedback_criteria),
+            'feedback_thresholds': dict(self.feedback_thresholds),
+            'batch_size': self.batch_size,
+            'max_chunk_words': self.max_chunk_words
+        }
+        chunks = [
+            (settings, student_answers[start:start + chunk_size], reference_answer, assignment_type, batch_size)
+            for start in range(0, len(student_answers), chunk_size)
         ]
+        try:
+            model = self._worker_model()
+            if self._pool is None or self._pool_workers != workers or self._pool_model is not model:
+                self.close()
+                self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model,))
+                self._pool_workers = workers
+                self._pool_model = model
+            return list(self._pool.map(function, chunks))
+        except Exception as e:
+            print(f"Warning: Parallel grading failed ({e}). Grading serially instead.")
+            self.stats.record_fallback('parallel', str(e))
+            self.close()
+            return None
+    
+    def _worker_model(self) -> Optional[object]:
+        """The backend workers must be given, or None when they can load it from model_name
+        
+        A backend passed in or assigned to model cannot be rebuilt from its
+        name, so it is pickled into every worker.
+        """
+        if not self.use_transformer or self.model is None:
+            return None
+        with _shared_models_lock:
+            if _shared_models.get(self.model_name) is self.model:
+                return None
+        try:
+            pickle.dumps(self.model)
+        except Exception as e:
+            raise RuntimeError(f"the embedding backend cannot be sent to worker processes ({e})") from e
+        return self.model
+    
+    def close(self):
+        """Shut down the worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
+            self._pool_model = None
     
     def get_assignment_types(self) -> List[str]:
         """Get available assignment types"""
-        return ["short_answer", "essay", "explanation", "analysis"]
\ No newline at end of file
+        return list(self.ASSIGNMENT_TYPES)
\ No newline at end of file
@@ -0,0 +1,189 @@
+import csv
+import hashlib
+import json
+import os
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+Row = Dict[str, str]
+Result = Dict[str, object]
+
+CHECKPOINT_VERSION = 1
+
+
+class CheckpointMismatch(ValueError):
+    """Raised when a checkpoint was written for a different input or different settings"""
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_rows_from(path: str, file_format: str, offset: int = 0) -> Iterator[Tuple[Row, int]]:
+    """Stream (row, byte offset just after the row) pairs from a CSV or JSONL file, starting at offset"""
+    with open(path, 'rb') as f:
+        if file_format == 'jsonl':
+            f.seek(offset)
+            for line in iter(f.readline, b''):
+                if line.strip():
+                    yield json.loads(line), f.tell()
+            return
+        if file_format != 'csv':
+            raise ValueError(f"Unsupported input format: {file_format}")
+
+        fieldnames = next(csv.reader([f.readline().decode('utf-8')]), [])
+        if offset:
+            f.seek(offset)
+        position = f.tell()
+
+        def lines() -> Iterator[str]:
+            # csv pulls exactly the lines of one record per row, so position
+            # is the end of the row DictReader just returned
+            nonlocal position
+            for line in iter(f.readline, b''):
+                position = f.tell()
+                yield line.decode('utf-8')
+
+        for row in csv.DictReader(lines(), fieldnames=fieldnames):
+            yield row, position
+
+
+def _line_start(f, end: int, block_size: int = 1 << 16) -> int:
+    """Offset where the line ending at end (exclusive of its newline) begins"""
+    position = end
+    while position > 0:
+        start = max(0, position - block_size)
+        f.seek(start)
+        newline = f.read(position - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        position = start
+    return 0
+
+
+class GradingJob:
+    """Grade a submissions file with an append-only checkpoint so it can be resumed
+
+    Each checkpoint line holds the results graded since the previous line
+    and the input byte offset they reach. Resuming reads only the header
+    and the last line, then seeks the input to that offset, so restart cost
+    grows with the remaining work rather than the finished work. The
+    header records a content hash of the input (and any settings passed as
+    fingerprint), and a mismatch raises CheckpointMismatch. When
+    current_settings is given it is called after every batch, and if the
+    fingerprint entries it returns have changed (say the model fell back
+    to lexical scoring) that batch is dropped and the job stops with
+    CheckpointMismatch, so no checkpoint mixes results of two scorers.
+    """
+
+    def __init__(self,
+                 input_path: str,
+                 checkpoint_path: str,
+                 grade: Callable[[List[Row]], List[Result]],
+                 file_format: str,
+                 batch_size: int = 256,
+                 checkpoint_every: int = 1000,
+                 fingerprint: Optional[Dict[str, object]] = None,
+                 current_settings: Optional[Callable[[], Dict[str, object]]] = None):
+        self.input_path = input_path
+        self.checkpoint_path = checkpoint_path
+        self.grade = grade
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.fingerprint = {'input_sha256': file_digest(input_path), **(fingerprint or {})}
+        self.current_settings = current_settings
+        self.cursor = 0
+        self.rows_done = 0
+        self.resumed_rows = 0
+
+    def _open_checkpoint(self):
+        """Create the checkpoint, or validate it and recover the cursor of its last record"""
+        if not os.path.exists(self.checkpoint_path) or os.path.getsize(self.checkpoint_path) == 0:
+            with open(self.checkpoint_path, 'wb') as f:
+                header = {'checkpoint_version': CHECKPOINT_VERSION, 'fingerprint': self.fingerprint}
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+            return
+
+        with open(self.checkpoint_path, 'r+b') as f:
+            header = json.loads(f.readline())
+            header_end = f.tell()
+            if header.get('fingerprint') != self.fingerprint:
+                raise CheckpointMismatch(
+                    f"Checkpoint {self.checkpoint_path} was written for a different input file or "
+                    f"different settings; delete it or restart the job"
+                )
+
+            # Anything after the last newline is a record torn by a crash mid-write
+            size = f.seek(0, os.SEEK_END)
+            f.seek(size - 1)
+            if f.read(1) != b'\n':
+                size = _line_start(f, size)
+                f.truncate(size)
+            if size > header_end:
+                start = _line_start(f, size - 1)
+                f.seek(start)
+                record = json.loads(f.read(size - start))
+                self.cursor = record['cursor']
+                self.rows_done = record['rows']
+        self.resumed_rows = self.rows_done
+
+    def _append(self, f, results: List[Result]):
+        record = {'cursor': self.cursor, 'rows': self.rows_done, 'results': results}
+        f.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _check_settings(self):
+        """Raise CheckpointMismatch if settings changed since the checkpoint header was written"""
+        if self.current_settings is None:
+            return
+        changed = sorted(key for key, value in self.current_settings().items() if self.fingerprint.get(key) != value)
+        if changed:
+            raise CheckpointMismatch(
+                f"Grading settings changed during the job ({', '.join(changed)}); results up to answer "
+                f"{self.rows_done} are checkpointed in {self.checkpoint_path}, rerun to resume or restart the job"
+            )
+
+    def run(self) -> int:
+        """Grade every row after the checkpoint cursor, returning how many were graded now"""
+        self._open_checkpoint()
+        rows = read_rows_from(self.input_path, self.file_format, self.cursor)
+        pending: List[Result] = []
+        graded = 0
+        with open(self.checkpoint_path, 'ab') as f:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                results = self.grade([row for row, _ in batch])
+                try:
+                    self._check_settings()
+                except CheckpointMismatch:
+                    # Keep what was graded before the change; this batch is graded again on resume
+                    if pending:
+                        self._append(f, pending)
+                    raise
+                pending.extend(results)
+                self.cursor = batch[-1][1]
+                self.rows_done += len(batch)
+                graded += len(batch)
+                if len(pending) >= self.checkpoint_every:
+                    self._append(f, pending)
+                    pending = []
+            if pending:
+                self._append(f, pending)
+        return graded
+
+    def iter_results(self) -> Iterator[List[Result]]:
+        """Every checkpointed result, one list per checkpoint record, in input order"""
+        with open(self.checkpoint_path, 'rb') as f:
+            f.readline()
+            for line in f:
+                if line.endswith(b'\n'):
+                    yield json.loads(line)['results']
@@ -0,0 +1,133 @@
+from typing import Dict, Iterator, List, Mapping, Tuple, Union
+
+import numpy as np
+
+# Criteria in the column order used by score matrices
+CRITERIA = ('content_accuracy', 'completeness', 'clarity', 'structure')
+
+# Feedback line per criterion for strong, fair and weak scores
+FEEDBACK_PHRASES = {
+    'content_accuracy': (
+        "✓ Excellent content accuracy",
+        "• Good content accuracy, but could be more precise",
+        "⚠ Content accuracy needs improvement"
+    ),
+    'completeness': (
+        "✓ Comprehensive answer",
+        "• Answer is somewhat complete, consider adding more details",
+        "⚠ Answer is incomplete, missing key elements"
+    ),
+    'clarity': (
+        "✓ Clear and well-expressed",
+        "• Generally clear, but could be more concise",
+        "⚠ Clarity needs improvement - consider restructuring"
+    ),
+    'structure': (
+        "✓ Well-structured response",
+        "• Decent structure, minor improvements needed",
+        "⚠ Structure needs work - check grammar and organization"
+    )
+}
+
+GradeResult = Tuple[int, str, Dict[str, float]]
+
+
+def compute_grades(score_matrix: np.ndarray, weights: Mapping[str, float]) -> np.ndarray:
+    """Vectorized equivalent of the weighted 0-5 grade for a (n, len(CRITERIA)) score matrix"""
+    # Accumulate in the weights' order so every grade matches _build_result exactly
+    overall = np.zeros(len(score_matrix))
+    for criterion, weight in weights.items():
+        overall += score_matrix[:, CRITERIA.index(criterion)] * weight
+    return np.clip(np.rint(overall * 5), 0, 5).astype(np.int64)
+
+
+def feedback_tiers(score_matrix: np.ndarray, thresholds: Mapping[str, float]) -> np.ndarray:
+    """Index into FEEDBACK_PHRASES (0 strong, 1 fair, 2 weak) for every score"""
+    tiers = np.full(score_matrix.shape, 2, dtype=np.int8)
+    tiers[score_matrix >= thresholds['fair']] = 1
+    tiers[score_matrix >= thresholds['strong']] = 0
+    return tiers
+
+
+def feedback_text(tiers: Tuple[int, ...]) -> str:
+    """Detailed feedback for one answer's criterion tiers"""
+    return "\n".join(FEEDBACK_PHRASES[criterion][tier] for criterion, tier in zip(CRITERIA, tiers))
+
+
+class GradingResults:
+    """Grading results held as NumPy columns instead of per-answer tuples
+
+    Scores are float32 columns per criterion and grades an int8 column.
+    Feedback is decided when the results are built (so it matches the
+    full-precision scores) but its text is only assembled on access.
+    Indexing and iteration still yield legacy (grade, feedback, scores) tuples.
+    """
+
+    def __init__(self, scores: Dict[str, np.ndarray], grades: np.ndarray, tiers: np.ndarray):
+        self.scores = scores
+        self.grades = grades
+        self._tiers = tiers
+
+    @classmethod
+    def from_scores(cls,
+                    score_matrix: np.ndarray,
+                    weights: Mapping[str, float],
+                    thresholds: Mapping[str, float]) -> "GradingResults":
+        """Build results from a (n, len(CRITERIA)) float64 score matrix"""
+        score_matrix = np.asarray(score_matrix, dtype=np.float64).reshape(-1, len(CRITERIA))
+        scores = {
+            criterion: np.ascontiguousarray(score_matrix[:, i], dtype=np.float32)
+            for i, criterion in enumerate(CRITERIA)
+        }
+        grades = compute_grades(score_matrix, weights).astype(np.int8)
+        return cls(scores, grades, feedback_tiers(score_matrix, thresholds))
+
+    def __len__(self) -> int:
+        return len(self.grades)
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray, List[int]]) -> Union[GradeResult, "GradingResults"]:
+        """One legacy tuple for an integer index, or a new GradingResults for slices and index arrays"""
+        if isinstance(index, (int, np.integer)):
+            return int(self.grades[index]), self.feedback(index), self.score_dict(index)
+        return GradingResults(
+            {criterion: column[index] for criterion, column in self.scores.items()},
+            self.grades[index],
+            self._tiers[index]
+        )
+
+    def __iter__(self) -> Iterator[GradeResult]:
+        grades = self.grades.tolist()
+        tiers = self._tiers.tolist()
+        columns = [self.scores[criterion].tolist() for criterion in CRITERIA]
+        for i, row in enumerate(zip(*columns)):
+            yield grades[i], feedback_text(tiers[i]), dict(zip(CRITERIA, row))
+
+    def feedback(self, index: int) -> str:
+        """Detailed feedback text for one answer"""
+        return feedback_text(self._tiers[index].tolist())
+
+    def score_dict(self, index: int) -> Dict[str, float]:
+        return {criterion: float(column[index]) for criterion, column in self.scores.items()}
+
+    def to_pandas(self, feedback: bool = False):
+        """DataFrame sharing memory with the grade and score columns
+
+        With feedback=True a materialized feedback column is added.
+        """
+        import pandas as pd
+        columns = {'grade': self.grades, **self.scores}
+        if feedback:
+            columns['feedback'] = [feedback_text(tiers) for tiers in self._tiers.tolist()]
+        return pd.DataFrame(columns, copy=False)
+
+    def to_arrow(self, feedback: bool = False):
+        """pyarrow Table wrapping the grade and score columns without copying them"""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise RuntimeError("Arrow export requires pyarrow (pip install pyarrow)") from e
+        columns = {'grade': pa.array(self.grades)}
+        columns.update((criterion, pa.array(column)) for criterion, column in self.scores.items())
+        if feedback:
+            columns['feedback'] = pa.array([feedback_text(tiers) for tiers in self._tiers.tolist()], pa.string())
+        return pa.table(columns)
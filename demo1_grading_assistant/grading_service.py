@@ -0,0 +1,327 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from embedding_backends import DEFAULT_MODEL
+from embedding_cache import EmbeddingCache
+from grading_assistant import GradingAssistant
+
+GradeResult = Tuple[int, str, Dict[str, float]]
+
+
+class ServiceOverloaded(Exception):
+    """Raised when the request queue is full and the caller asked not to wait"""
+
+
+def _check_arguments(student_answer: str, reference_answer: str, assignment_type: str):
+    """Raise TypeError unless every grading argument is a string"""
+    for name, value in (('student_answer', student_answer),
+                        ('reference_answer', reference_answer),
+                        ('assignment_type', assignment_type)):
+        if not isinstance(value, str):
+            raise TypeError(f"{name} must be a string, got {type(value).__name__}")
+
+
+class _Request:
+    __slots__ = ('student_answer', 'reference_answer', 'assignment_type', 'future', 'enqueued_at')
+
+    def __init__(self, student_answer: str, reference_answer: str, assignment_type: str, future: asyncio.Future):
+        self.student_answer = student_answer
+        self.reference_answer = reference_answer
+        self.assignment_type = assignment_type
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class GradingService:
+    """Asyncio front end that merges concurrent grading requests into batched model calls"""
+
+    def __init__(self,
+                 grader: GradingAssistant,
+                 max_batch_size: int = 64,
+                 max_wait: float = 0.01,
+                 max_queue_size: int = 1024,
+                 latency_window: int = 10000):
+        self.grader = grader
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        # A single inference thread keeps the event loop free and model calls serialized
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="grading-inference")
+        self._latencies = deque(maxlen=latency_window)
+        self.requests_completed = 0
+        self.batches_run = 0
+        self.requests_rejected = 0
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        return self._queue
+
+    async def start(self):
+        """Start the background batching task"""
+        if self._batcher is None:
+            self._batcher = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop batching; requests still queued are cancelled"""
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            self._queue.get_nowait().future.cancel()
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def grade(self,
+                    student_answer: str,
+                    reference_answer: str,
+                    assignment_type: str = "short_answer",
+                    wait: bool = True) -> GradeResult:
+        """Grade one answer; concurrent calls are graded together
+
+        When the queue is full, waits for room (backpressure) or, with
+        wait=False, raises ServiceOverloaded straight away. Arguments are
+        checked before queueing, so a bad request never fails its batch.
+        """
+        _check_arguments(student_answer, reference_answer, assignment_type)
+        future = asyncio.get_running_loop().create_future()
+        request = _Request(student_answer, reference_answer, assignment_type, future)
+        if wait:
+            await self.queue.put(request)
+        else:
+            try:
+                self.queue.put_nowait(request)
+            except asyncio.QueueFull:
+                self.requests_rejected += 1
+                raise ServiceOverloaded(f"Grading queue is full ({self.max_queue_size} requests)")
+        return await future
+
+    async def _collect_batch(self) -> List[_Request]:
+        """Wait for one request, then gather more until the batch is full or max_wait passes"""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _grade_batch(self, batch: List[_Request]) -> List[Union[GradeResult, Exception]]:
+        """Grade a batch in the inference thread, one batched call per reference answer
+
+        A group whose call fails gets its exception in place of results, so
+        other groups in the batch still complete.
+        """
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, request in enumerate(batch):
+            groups.setdefault((request.reference_answer, request.assignment_type), []).append(i)
+
+        results: List[Union[GradeResult, Exception, None]] = [None] * len(batch)
+        for (reference_answer, assignment_type), positions in groups.items():
+            try:
+                graded = self.grader.grade_multiple_responses(
+                    [batch[i].student_answer for i in positions], reference_answer, assignment_type
+                )
+            except Exception as e:
+                graded = [e] * len(positions)
+            for i, result in zip(positions, graded):
+                results[i] = result
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            live = [request for request in batch if not request.future.done()]
+            if not live:
+                continue
+            try:
+                results = await loop.run_in_executor(self._executor, self._grade_batch, live)
+            except Exception as e:
+                for request in live:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            self.batches_run += 1
+            finished = time.perf_counter()
+            for request, result in zip(live, results):
+                if request.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+                    self._latencies.append(finished - request.enqueued_at)
+                    self.requests_completed += 1
+
+    def latency_percentiles(self) -> Dict[str, float]:
+        """p50/p99 request latency in seconds over the recent window"""
+        if not self._latencies:
+            return {'p50': 0.0, 'p99': 0.0, 'count': 0}
+        p50, p99 = np.percentile(np.fromiter(self._latencies, dtype=float), [50, 99])
+        return {'p50': float(p50), 'p99': float(p99), 'count': len(self._latencies)}
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue_size': self.max_queue_size,
+            'requests_completed': self.requests_completed,
+            'requests_rejected': self.requests_rejected,
+            'batches_run': self.batches_run,
+            'mean_batch_size': self.requests_completed / self.batches_run if self.batches_run else 0.0,
+            'latency_seconds': self.latency_percentiles(),
+            'grader': self.grader.stats.snapshot()['counters'],
+            'embedding_cache': self.grader.embedding_cache.stats() if self.grader.embedding_cache else None
+        }
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+
+class _BadRequest(Exception):
+    """A request that cannot be parsed or has invalid fields"""
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    """Method, path and body of one HTTP request"""
+    try:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        content_length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                content_length = int(value.strip())
+        payload = await reader.readexactly(content_length) if content_length else b''
+    except (ValueError, asyncio.IncompleteReadError) as e:
+        raise _BadRequest(e) from e
+    method, path = (request_line + ['', ''])[:2]
+    return method, path, payload
+
+
+def _grade_arguments(payload: bytes) -> Tuple[str, str, str]:
+    """student_answer, reference_answer and assignment_type of a /grade body"""
+    try:
+        data = json.loads(payload or b'{}')
+        arguments = (data['student_answer'], data['reference_answer'], data.get('assignment_type', "short_answer"))
+        _check_arguments(*arguments)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise _BadRequest(e) from e
+    return arguments
+
+
+async def _handle_http(service: GradingService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """Minimal HTTP/1.1 handler: POST /grade and GET /stats, one request per connection"""
+    status, body, headers = 200, {}, {}
+    try:
+        method, path, payload = await _read_request(reader)
+        if path == '/stats':
+            body = service.stats() if method == 'GET' else {'error': "Use GET"}
+            status = 200 if method == 'GET' else 405
+        elif path == '/grade':
+            if method != 'POST':
+                status, body = 405, {'error': "Use POST"}
+            else:
+                grade, feedback, scores = await service.grade(*_grade_arguments(payload), wait=False)
+                body = {'grade': grade, 'feedback': feedback, 'scores': scores}
+        else:
+            status, body = 404, {'error': f"Unknown path {path}"}
+    except ServiceOverloaded as e:
+        status, body, headers = 503, {'error': str(e)}, {'Retry-After': '1'}
+    except _BadRequest as e:
+        status, body = 400, {'error': f"Invalid request: {e}"}
+    except Exception as e:
+        # Requests are validated before queueing, so anything else is a grading failure
+        status, body = 500, {'error': f"Grading failed: {e}"}
+
+    try:
+        encoded = json.dumps(body).encode('utf-8')
+        head = [f"HTTP/1.1 {status} {_REASONS[status]}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(encoded)}",
+                "Connection: close"]
+        head.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode('latin-1') + encoded)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(service: GradingService, host: str = '127.0.0.1', port: int = 8600) -> asyncio.AbstractServer:
+    """Start the batching task and an HTTP server in front of it"""
+    await service.start()
+    return await asyncio.start_server(lambda r, w: _handle_http(service, r, w), host, port)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Local HTTP grading service with micro-batched model calls")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--max-batch-size', type=int, default=64, help="Most requests merged into one batch")
+    parser.add_argument('--max-wait-ms', type=float, default=10.0, help="Longest wait for a batch to fill")
+    parser.add_argument('--max-queue', type=int, default=1024, help="Queued requests before returning 503")
+    parser.add_argument('--backend', default=DEFAULT_MODEL,
+                        help="Embedding backend: a sentence-transformers model, quantized:<path> or hashed")
+    parser.add_argument('--no-transformer', action='store_true',
+                        help="Skip the transformer model and use the lexical fallback")
+    parser.add_argument('--embedding-cache', metavar='PATH',
+                        help="SQLite file that keeps embeddings between runs")
+    parser.add_argument('--embedding-cache-size', type=int, default=10000,
+                        help="Embeddings kept in memory (least recently used are evicted)")
+    args = parser.parse_args(argv)
+    if args.embedding_cache_size < 1:
+        parser.error("--embedding-cache-size must be at least 1")
+
+    cache = EmbeddingCache(max_entries=args.embedding_cache_size, path=args.embedding_cache)
+    grader = GradingAssistant(embedding_cache=cache, model_name=args.backend)
+    if args.no_transformer:
+        grader.use_transformer = False
+    service = GradingService(grader, args.max_batch_size, args.max_wait_ms / 1000, args.max_queue)
+
+    async def run():
+        server = await serve(service, args.host, args.port)
+        print(f"Grading service listening on http://{args.host}:{args.port} (POST /grade, GET /stats)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await service.stop()
+            cache.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import sqlite3
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from grading_assistant import GradingAssistant, cosine_to_reference
+from grading_results import CRITERIA, compute_grades, feedback_text, feedback_tiers
+from text_analysis import TextFeatures, analyze_text
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class GradingSession:
+    """Persistent per-answer criterion scores that support cheap re-grading
+
+    Changing weights or feedback thresholds only re-aggregates the stored
+    scores. Changing the reference re-scores content accuracy and
+    completeness; clarity and structure depend only on the student text
+    and are kept, and each answer's embedding is stored so only the new
+    reference is encoded. Only new or edited answers are scored from scratch.
+    Weights and thresholds belong to the session, so a grader shared between
+    sessions is never changed. Every content accuracy score comes from one
+    scorer (the embedding model, or 'lexical'): when it differs from the one
+    the stored scores used, every answer's content accuracy is re-scored.
+    """
+
+    def __init__(self,
+                 grader: GradingAssistant,
+                 reference_answer: Optional[str] = None,
+                 path: Optional[str] = None,
+                 assignment_type: str = "short_answer"):
+        self.grader = grader
+        self.assignment_type = assignment_type
+        self._db = sqlite3.connect(path or ':memory:')
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " answer_id TEXT PRIMARY KEY, position INTEGER NOT NULL, answer TEXT NOT NULL,"
+            " answer_hash TEXT NOT NULL, content_accuracy REAL, completeness REAL, clarity REAL, structure REAL,"
+            " embedding BLOB);"
+        )
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(answers)")]
+        if 'embedding' not in columns:
+            self._db.execute("ALTER TABLE answers ADD COLUMN embedding BLOB")
+
+        # Restore what an earlier session on the same file stored, else start from the grader's settings
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        self.feedback_criteria: Dict[str, float] = (
+            json.loads(meta['feedback_criteria']) if 'feedback_criteria' in meta else dict(grader.feedback_criteria)
+        )
+        self.feedback_thresholds: Dict[str, float] = (
+            json.loads(meta['feedback_thresholds']) if 'feedback_thresholds' in meta
+            else dict(grader.feedback_thresholds)
+        )
+        self.reference_answer: Optional[str] = meta.get('reference_answer')
+
+        self.answer_ids: List[str] = []
+        self.answers: Dict[str, str] = {}
+        self._hashes: Dict[str, str] = {}
+        self._row: Dict[str, int] = {}
+        # float32 embeddings by answer id, valid only for the scorer that produced them
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self.scores = np.zeros((0, len(CRITERIA)))
+        self.scorer = self._current_scorer()
+        keep_embeddings = meta.get('scorer') == self.scorer
+        if not keep_embeddings:
+            self._db.execute("UPDATE answers SET embedding = NULL")
+        rows = self._db.execute(
+            "SELECT answer_id, answer, answer_hash, embedding, " + ", ".join(CRITERIA)
+            + " FROM answers ORDER BY position"
+        ).fetchall()
+        if rows:
+            self.scores = np.array([row[4:] for row in rows], dtype=np.float64)
+            for i, (answer_id, answer, answer_hash, embedding) in enumerate(row[:4] for row in rows):
+                self.answer_ids.append(answer_id)
+                self.answers[answer_id] = answer
+                self._hashes[answer_id] = answer_hash
+                self._row[answer_id] = i
+                if embedding is not None and keep_embeddings:
+                    self._embeddings[answer_id] = np.frombuffer(embedding, dtype=np.float32)
+
+        # Counts from the most recent update, to see how much work was skipped
+        self.last_rescored: Dict[str, int] = {}
+        self._set_meta('scorer', self.scorer)
+        self._db.commit()
+        if reference_answer is not None and reference_answer != self.reference_answer:
+            self.set_reference(reference_answer)
+        elif self.answer_ids and meta.get('scorer') != self.scorer:
+            self._score_reference_criteria(self.answer_ids)
+            self.last_rescored = {'answers': 0, 'reference_criteria': len(self.answer_ids)}
+
+    def _current_scorer(self) -> str:
+        """What content accuracy is computed with right now; loads the grader's model"""
+        grader = self.grader
+        return grader.model_name if grader.use_transformer and grader.model is not None else 'lexical'
+
+    def _set_meta(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _save_rows(self, answer_ids: List[str]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO answers (answer_id, position, answer, answer_hash, embedding, "
+            + ", ".join(CRITERIA) + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (answer_id, self._row[answer_id], self.answers[answer_id], self._hashes[answer_id],
+                 self._embeddings[answer_id].tobytes() if answer_id in self._embeddings else None,
+                 *self.scores[self._row[answer_id]].tolist())
+                for answer_id in answer_ids
+            ]
+        )
+        self._db.commit()
+
+    def _embedding_similarities(self, answer_ids: List[str]) -> Optional[np.ndarray]:
+        """Embedding similarity of answers to the reference, encoding only answers without a stored embedding"""
+        grader = self.grader
+        if not (grader.use_transformer and grader.model):
+            return None
+        try:
+            missing = [answer_id for answer_id in answer_ids if answer_id not in self._embeddings]
+            texts = [self.answers[answer_id] for answer_id in missing] + [self.reference_answer]
+            encoded = grader._encode(texts).astype(np.float32)
+        except Exception as e:
+            grader.fall_back_to_lexical(e)
+            return None
+        self._embeddings.update(zip(missing, encoded[:-1]))
+        embeddings = np.vstack([self._embeddings[answer_id] for answer_id in answer_ids])
+        return cosine_to_reference(embeddings, encoded[-1])
+
+    def _score_reference_criteria(self, answer_ids: List[str], students: Optional[List[TextFeatures]] = None):
+        """Store content accuracy and completeness of answers, keeping one scorer across the session"""
+        if students is None:
+            students = [analyze_text(self.answers[answer_id]) for answer_id in answer_ids]
+        accuracy, completeness = self._reference_scores(answer_ids, students)
+        rows = [self._row[answer_id] for answer_id in answer_ids]
+        self.scores[rows, CRITERIA.index('content_accuracy')] = accuracy
+        self.scores[rows, CRITERIA.index('completeness')] = completeness
+
+        # The model failed while scoring, so scores of the other answers came from a different scorer
+        scorer = self._current_scorer()
+        if scorer != self.scorer:
+            self.scorer = scorer
+            self._embeddings.clear()
+            self._set_meta('scorer', scorer)
+            if len(answer_ids) < len(self.answer_ids):
+                self._score_reference_criteria(self.answer_ids)
+                return
+        self._save_rows(answer_ids)
+
+    def _reference_scores(self,
+                          answer_ids: List[str],
+                          students: List[TextFeatures]) -> Tuple[np.ndarray, np.ndarray]:
+        """Content accuracy and completeness of answers against the current reference"""
+        texts = [self.answers[answer_id] for answer_id in answer_ids]
+        reference = analyze_text(self.reference_answer)
+        accuracy = self._embedding_similarities(answer_ids)
+        if accuracy is None:
+            accuracy = self.grader.calculate_similarities(texts, self.reference_answer, None, students, reference)
+        completeness = [self.grader._completeness_score(student, reference) for student in students]
+        return np.array(accuracy, dtype=np.float64), np.array(completeness, dtype=np.float64)
+
+    def update_answers(self, answers: Mapping[str, str]) -> int:
+        """Add or edit answers by id, scoring only those that are new or changed"""
+        if self.reference_answer is None:
+            raise ValueError("Set a reference answer before adding answers")
+
+        changed = []
+        for answer_id, text in answers.items():
+            answer_id = str(answer_id)
+            answer_hash = _digest(text)
+            if self._hashes.get(answer_id) == answer_hash:
+                continue
+            if answer_id not in self._row:
+                self._row[answer_id] = len(self.answer_ids)
+                self.answer_ids.append(answer_id)
+            self.answers[answer_id] = text
+            self._hashes[answer_id] = answer_hash
+            self._embeddings.pop(answer_id, None)
+            changed.append(answer_id)
+
+        if len(self.scores) < len(self.answer_ids):
+            grown = np.zeros((len(self.answer_ids), len(CRITERIA)))
+            grown[:len(self.scores)] = self.scores
+            self.scores = grown
+
+        if changed:
+            rows = [self._row[answer_id] for answer_id in changed]
+            students = [analyze_text(self.answers[answer_id]) for answer_id in changed]
+            self.scores[rows, CRITERIA.index('clarity')] = [self.grader._clarity_score(s) for s in students]
+            self.scores[rows, CRITERIA.index('structure')] = [self.grader._structure_score(s) for s in students]
+            self._score_reference_criteria(changed, students)
+
+        self.last_rescored = {'answers': len(changed), 'reference_criteria': 0}
+        return len(changed)
+
+    def set_reference(self, reference_answer: str) -> int:
+        """Change the reference, re-scoring only the reference-dependent criteria"""
+        self.reference_answer = reference_answer
+        self._set_meta('reference_answer', reference_answer)
+        if self.answer_ids:
+            self._score_reference_criteria(self.answer_ids)
+        self._db.commit()
+        self.last_rescored = {'answers': 0, 'reference_criteria': len(self.answer_ids)}
+        return len(self.answer_ids)
+
+    def set_weights(self, weights: Mapping[str, float]):
+        """Change criterion weights; grades are re-aggregated without any model calls"""
+        unknown = set(weights) - set(CRITERIA)
+        if unknown:
+            raise ValueError(f"Unknown criteria: {', '.join(sorted(unknown))}")
+        self.feedback_criteria = dict(weights)
+        self._set_meta('feedback_criteria', json.dumps(self.feedback_criteria))
+        self._db.commit()
+        self.last_rescored = {'answers': 0, 'reference_criteria': 0}
+
+    def set_feedback_thresholds(self, strong: float, fair: float):
+        """Change feedback cut-offs; only the feedback text changes"""
+        self.feedback_thresholds = {'strong': strong, 'fair': fair}
+        self._set_meta('feedback_thresholds', json.dumps(self.feedback_thresholds))
+        self._db.commit()
+        self.last_rescored = {'answers': 0, 'reference_criteria': 0}
+
+    def grades(self) -> np.ndarray:
+        """Current 0-5 grade of every answer, in insertion order"""
+        return compute_grades(self.scores, self.feedback_criteria)
+
+    def results(self) -> List[Tuple[str, int, str, Dict[str, float]]]:
+        """(answer_id, grade, feedback, scores) for every answer, in insertion order"""
+        tiers = feedback_tiers(self.scores, self.feedback_thresholds)
+        return [
+            (answer_id, grade, feedback_text(answer_tiers), dict(zip(CRITERIA, row)))
+            for answer_id, grade, answer_tiers, row in zip(
+                self.answer_ids, self.grades().tolist(), tiers.tolist(), self.scores.tolist()
+            )
+        ]
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,156 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence
+
+# Upper bounds in seconds for the per-stage wall time histograms
+TIME_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, math.inf)
+# Upper bounds for the number of texts per encode call
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, math.inf)
+
+Hook = Callable[[str, Dict[str, object]], None]
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running sum and count"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'buckets': {_format_bound(bound): count for bound, count in zip(self.buckets, self.counts)}
+        }
+
+
+def _format_bound(bound: float) -> str:
+    return '+Inf' if math.isinf(bound) else f"{bound:g}"
+
+
+class GradingStats:
+    """Per-stage timings, counters and fallback events collected while grading"""
+
+    COUNTERS = ('encode_calls', 'texts_encoded', 'texts_analyzed', 'tokens_processed', 'texts_graded', 'fallback_events')
+
+    def __init__(self, max_events: int = 100):
+        self._lock = threading.Lock()
+        self._hooks: List[Hook] = []
+        self._max_events = max_events
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far (hooks stay registered)"""
+        with self._lock:
+            self.stages: Dict[str, Histogram] = {}
+            self.counters: Dict[str, int] = {name: 0 for name in self.COUNTERS}
+            self.batch_sizes = Histogram(BATCH_BUCKETS)
+            self.fallbacks = deque(maxlen=self._max_events)
+
+    def add_hook(self, hook: Hook):
+        """Call hook(event, payload) for every 'stage' and 'fallback' event"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook):
+        self._hooks.remove(hook)
+
+    def _emit(self, event: str, payload: Dict[str, object]):
+        for hook in list(self._hooks):
+            hook(event, payload)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time a block of work and record it under stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - start)
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(TIME_BUCKETS)
+            self.stages[stage].observe(seconds)
+        self._emit('stage', {'stage': stage, 'seconds': seconds})
+
+    def increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def observe_batch(self, size: int):
+        """Record one encode call of size texts"""
+        with self._lock:
+            self.batch_sizes.observe(size)
+            self.counters['encode_calls'] += 1
+            self.counters['texts_encoded'] += size
+
+    def record_fallback(self, stage: str, reason: str):
+        """Record that grading switched to the lexical fallback"""
+        event = {'stage': stage, 'reason': reason, 'time': time.time()}
+        with self._lock:
+            self.counters['fallback_events'] += 1
+            self.fallbacks.append(event)
+        self._emit('fallback', event)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Everything recorded so far as plain JSON-serializable data"""
+        with self._lock:
+            return {
+                'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+                'counters': dict(self.counters),
+                'encode_batch_sizes': self.batch_sizes.to_dict(),
+                'fallbacks': list(self.fallbacks)
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self, prefix: str = 'grading') -> str:
+        """Render the stats in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Wall time spent in each grading stage",
+            f"# TYPE {prefix}_stage_seconds histogram"
+        ]
+        for stage, histogram in sorted(snapshot['stages'].items()):
+            lines.extend(_histogram_lines(f"{prefix}_stage_seconds", histogram, f'stage="{stage}"'))
+
+        lines.append(f"# HELP {prefix}_encode_batch_size Texts per model encode call")
+        lines.append(f"# TYPE {prefix}_encode_batch_size histogram")
+        lines.extend(_histogram_lines(f"{prefix}_encode_batch_size", snapshot['encode_batch_sizes']))
+
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(name: str, histogram: Dict[str, object], labels: str = '') -> List[str]:
+    """Prometheus sample lines for one histogram, with cumulative buckets"""
+    separator = ',' if labels else ''
+    lines = []
+    cumulative = 0
+    for bound, count in histogram['buckets'].items():
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ''
+    lines.append(f"{name}_sum{suffix} {histogram['sum']}")
+    lines.append(f"{name}_count{suffix} {histogram['count']}")
+    return lines
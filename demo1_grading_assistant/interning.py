@@ -0,0 +1,128 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from lexical import TermMatrix
+from text_analysis import text_statistics, tokenize
+
+
+class TokenInterner:
+    """Map tokens to dense int32 ids so each distinct token string is stored once"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def intern(self, tokens: List[str]) -> Iterator[int]:
+        """Ids of tokens, assigning new ids to tokens not seen before"""
+        ids = self.ids
+        for token in dict.fromkeys(tokens):
+            ids.setdefault(token, len(ids))
+        return map(ids.__getitem__, tokens)
+
+
+class InternedCorpus:
+    """Token ids and text statistics of many texts in flat NumPy buffers
+
+    Each text's tokens are kept as its sorted distinct int32 ids plus their
+    counts (a CSR layout), and the statistics the criteria scorers need are
+    kept as one column per statistic, instead of a token list, a token set
+    and a features object per text.
+    """
+
+    def __init__(self,
+                 interner: TokenInterner,
+                 indptr: np.ndarray,
+                 ids: np.ndarray,
+                 counts: np.ndarray,
+                 token_counts: np.ndarray,
+                 sentence_counts: np.ndarray,
+                 sentence_words: np.ndarray,
+                 word_counts: np.ndarray,
+                 has_punctuation: np.ndarray,
+                 has_capital: np.ndarray):
+        self.interner = interner
+        self.indptr = indptr
+        self.ids = ids
+        self.counts = counts
+        self.token_counts = token_counts
+        self.sentence_counts = sentence_counts
+        self.sentence_words = sentence_words
+        self.word_counts = word_counts
+        self.has_punctuation = has_punctuation
+        self.has_capital = has_capital
+
+    @classmethod
+    def build(cls, texts: Sequence[str], interner: Optional[TokenInterner] = None) -> "InternedCorpus":
+        """Tokenize and analyze every text, interning tokens as they are read"""
+        interner = interner if interner is not None else TokenInterner()
+        flat_ids = array('i')
+        token_counts = array('i')
+        sentence_counts = array('i')
+        sentence_words = array('i')
+        word_counts = array('i')
+        has_punctuation = bytearray()
+        has_capital = bytearray()
+        for text in texts:
+            sentence_lengths, punctuation, capital, word_count = text_statistics(text)
+            sentence_counts.append(len(sentence_lengths))
+            sentence_words.append(sum(sentence_lengths))
+            word_counts.append(word_count)
+            has_punctuation.append(punctuation)
+            has_capital.append(capital)
+            tokens = tokenize(text)
+            token_counts.append(len(tokens))
+            flat_ids.extend(interner.intern(tokens))
+
+        n_rows = len(token_counts)
+        lengths = np.frombuffer(token_counts, dtype=np.int32)
+        width = max(len(interner), 1)
+        # Counting (row, id) keys gives every row's distinct ids already sorted
+        keys, counts = np.unique(
+            np.repeat(np.arange(n_rows, dtype=np.int64), lengths) * width + np.frombuffer(flat_ids, dtype=np.int32),
+            return_counts=True
+        )
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // width, minlength=n_rows), out=indptr[1:])
+        return cls(
+            interner,
+            indptr,
+            (keys % width).astype(np.int32),
+            counts.astype(np.int32),
+            lengths.copy(),
+            np.frombuffer(sentence_counts, dtype=np.int32).copy(),
+            np.frombuffer(sentence_words, dtype=np.int32).copy(),
+            np.frombuffer(word_counts, dtype=np.int32).copy(),
+            np.frombuffer(bytes(has_punctuation), dtype=np.bool_),
+            np.frombuffer(bytes(has_capital), dtype=np.bool_)
+        )
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    def row_ids(self, row: int) -> np.ndarray:
+        """Sorted distinct token ids of one text"""
+        return self.ids[self.indptr[row]:self.indptr[row + 1]]
+
+    def term_matrix(self) -> TermMatrix:
+        """Token counts as a TermMatrix over the interner's current vocabulary"""
+        return TermMatrix(self.indptr, self.ids, self.counts.astype(np.float64), max(len(self.interner), 1))
+
+    def dense_counts(self, row: int) -> np.ndarray:
+        """Token counts of one text as a dense vector over the interner's vocabulary"""
+        vector = np.zeros(max(len(self.interner), 1))
+        start, stop = self.indptr[row], self.indptr[row + 1]
+        vector[self.ids[start:stop]] = self.counts[start:stop]
+        return vector
+
+    def overlap_counts(self, reference_ids: np.ndarray) -> np.ndarray:
+        """Size of the intersection of every text's distinct ids with the sorted reference ids"""
+        # Binary search of every entry into the sorted reference, one pass for all texts
+        positions = np.searchsorted(reference_ids, self.ids)
+        found = positions < len(reference_ids)
+        found[found] = reference_ids[positions[found]] == self.ids[found]
+        rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+        return np.bincount(rows, weights=found, minlength=len(self))
@@ -0,0 +1,145 @@
+import zlib
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class TermMatrix:
+    """Sparse term-frequency matrix in CSR layout, one row per text"""
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, n_features: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_features = n_features
+        self.entry_rows = np.repeat(np.arange(self.n_rows), np.diff(indptr))
+        self.norms = np.sqrt(self.row_sums(data * data))
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def row_sums(self, values: np.ndarray) -> np.ndarray:
+        """Sum per-entry values into one total per row"""
+        return np.bincount(self.entry_rows, weights=values, minlength=self.n_rows)
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """Dot product of every row with a dense vector"""
+        return self.row_sums(self.data * vector[self.indices])
+
+
+class LexicalVectorizer:
+    """Build term-frequency matrices over a shared vocabulary or a hashed feature space"""
+
+    def __init__(self, n_features: Optional[int] = None):
+        # With n_features set, tokens are hashed into that many buckets and no
+        # vocabulary is kept; collisions make scores approximate
+        self.n_features = n_features
+        self.vocabulary: Dict[str, int] = {}
+
+    @property
+    def feature_count(self) -> int:
+        return self.n_features or len(self.vocabulary)
+
+    def _token_ids(self, tokens: List[str]) -> np.ndarray:
+        """Map tokens to feature ids, growing the vocabulary with unseen tokens"""
+        if self.n_features:
+            hashes = np.fromiter(map(zlib.crc32, map(str.encode, tokens)), dtype=np.int64, count=len(tokens))
+            return hashes % self.n_features
+        vocabulary = self.vocabulary
+        for token in dict.fromkeys(tokens):
+            vocabulary.setdefault(token, len(vocabulary))
+        return np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+
+    def transform(self, token_lists: Sequence[List[str]]) -> TermMatrix:
+        """Count the tokens of every text into one sparse matrix"""
+        n_rows = len(token_lists)
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n_rows)
+        ids = self._token_ids(list(chain.from_iterable(token_lists)))
+        width = max(self.feature_count, 1)
+
+        # Counting (row, term) keys gives the CSR entries already sorted by row
+        keys, counts = np.unique(np.repeat(np.arange(n_rows), lengths) * width + ids, return_counts=True)
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // width, minlength=n_rows), out=indptr[1:])
+        return TermMatrix(indptr, keys % width, counts.astype(np.float64), width)
+
+    def dense_vector(self, tokens: List[str]) -> np.ndarray:
+        """Count one text's tokens into a dense vector over the current features"""
+        ids = self._token_ids(tokens)
+        return np.bincount(ids, minlength=self.feature_count).astype(np.float64)
+
+
+def cosine_to_vector(matrix: TermMatrix, vector: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row to one dense vector, 0.0 when either side is empty"""
+    denominator = matrix.norms * np.sqrt(vector @ vector)
+    return np.divide(
+        matrix.dot(vector), denominator,
+        out=np.zeros(matrix.n_rows), where=denominator > 0
+    )
+
+
+def similarities_to_reference(token_lists: Sequence[List[str]],
+                              reference_tokens: List[str],
+                              n_features: Optional[int] = None) -> np.ndarray:
+    """Bag-of-words cosine similarity of every token list to the reference tokens"""
+    vectorizer = LexicalVectorizer(n_features)
+    matrix = vectorizer.transform(token_lists)
+    return cosine_to_vector(matrix, vectorizer.dense_vector(reference_tokens))
+
+
+def iter_pairwise_similarities(matrix: TermMatrix,
+                               block_size: Optional[int] = None,
+                               max_block_cells: int = 1 << 22,
+                               max_products: int = 1 << 22) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yield (first_row, block) pairs of row-vs-all cosine similarities
+
+    Only row blocks are ever materialized, so memory stays bounded by
+    max_block_cells and max_products no matter how many rows there are.
+    """
+    n_rows = matrix.n_rows
+    if n_rows == 0:
+        return
+    if block_size is None:
+        block_size = max(1, max_block_cells // n_rows)
+
+    # Column-major copy of the entries so each term's postings are contiguous
+    order = np.argsort(matrix.indices, kind='stable')
+    posting_rows = matrix.entry_rows[order]
+    posting_data = matrix.data[order]
+    col_ptr = np.zeros(matrix.n_features + 1, dtype=np.int64)
+    np.cumsum(np.bincount(matrix.indices, minlength=matrix.n_features), out=col_ptr[1:])
+
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        lo, hi = matrix.indptr[start], matrix.indptr[stop]
+        rows = matrix.entry_rows[lo:hi] - start
+        cols = matrix.indices[lo:hi]
+        values = matrix.data[lo:hi]
+        fanout = col_ptr[cols + 1] - col_ptr[cols]
+
+        dots = np.zeros((stop - start) * n_rows)
+        total = np.cumsum(fanout)
+        if len(total) and total[-1]:
+            # Split the block's entries so no chunk expands into too many partial products
+            cuts = np.searchsorted(total, np.arange(max_products, total[-1], max_products), side='right')
+            edges = np.unique(np.concatenate(([0], cuts, [len(total)])))
+            for a, b in zip(edges[:-1], edges[1:]):
+                chunk_fanout = fanout[a:b]
+                count = int(chunk_fanout.sum())
+                if not count:
+                    continue
+                # Position of every (entry, posting) pair inside the column-major arrays
+                first = col_ptr[cols[a:b]] - (np.cumsum(chunk_fanout) - chunk_fanout)
+                positions = np.repeat(first, chunk_fanout) + np.arange(count)
+                keys = np.repeat(rows[a:b], chunk_fanout) * n_rows + posting_rows[positions]
+                products = np.repeat(values[a:b], chunk_fanout) * posting_data[positions]
+                dots += np.bincount(keys, weights=products, minlength=dots.size)
+
+        denominator = np.outer(matrix.norms[start:stop], matrix.norms)
+        similarities = np.divide(
+            dots.reshape(stop - start, n_rows), denominator,
+            out=np.zeros((stop - start, n_rows)), where=denominator > 0
+        )
+        yield start, similarities
@@ -0,0 +1,145 @@
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA, GradeResult, GradingResults
+from lexical import LexicalVectorizer, cosine_to_vector
+from text_analysis import TextFeatures
+
+
+def _unit_rows(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0)
+
+
+class ReferenceIndex:
+    """Precomputed exemplar answers for a bank of questions
+
+    Each question may have several accepted exemplars. Their analyzed
+    features and unit-length embeddings are computed once; answers are then
+    scored against all of their question's exemplars with one matrix
+    product. Content accuracy is the best similarity (or the mean of the
+    top_k best), and completeness is measured against the best-matching
+    exemplar.
+    """
+
+    def __init__(self,
+                 grader: GradingAssistant,
+                 question_bank: Mapping[str, Sequence[str]],
+                 top_k: int = 1):
+        if top_k < 1:
+            raise ValueError("top_k must be at least 1")
+        self.grader = grader
+        self.top_k = top_k
+        self.exemplars: Dict[str, List[str]] = {}
+        for question_id, exemplars in question_bank.items():
+            exemplars = [exemplars] if isinstance(exemplars, str) else list(exemplars)
+            if not exemplars:
+                raise ValueError(f"Question '{question_id}' has no exemplar answers")
+            self.exemplars[str(question_id)] = exemplars
+
+        # Rows of the flattened exemplar list belonging to each question
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        texts: List[str] = []
+        for question_id, exemplars in self.exemplars.items():
+            self._offsets[question_id] = (len(texts), len(texts) + len(exemplars))
+            texts.extend(exemplars)
+        self._features = grader._analyze_all(texts)
+        self._embeddings: Optional[np.ndarray] = None
+        if grader.use_transformer and grader.model:
+            try:
+                self._embeddings = _unit_rows(grader._encode(texts).astype(np.float32))
+            except Exception as e:
+                grader.fall_back_to_lexical(e)
+
+    def __contains__(self, question_id: str) -> bool:
+        return str(question_id) in self._offsets
+
+    def _exemplar_similarities(self,
+                               question_id: str,
+                               rows: List[int],
+                               embeddings: Optional[np.ndarray],
+                               students: List[TextFeatures]) -> np.ndarray:
+        """(len(rows), exemplars) similarities of a question's answers to its exemplars"""
+        start, stop = self._offsets[question_id]
+        if embeddings is not None and self._embeddings is not None:
+            return embeddings[rows] @ self._embeddings[start:stop].T
+        vectorizer = LexicalVectorizer()
+        matrix = vectorizer.transform([students[row].tokens for row in rows])
+        return np.column_stack([
+            cosine_to_vector(matrix, vectorizer.dense_vector(feature.tokens))
+            for feature in self._features[start:stop]
+        ])
+
+    def score_matrix(self,
+                     question_ids: Sequence[str],
+                     answers: Sequence[str],
+                     batch_size: Optional[int] = None) -> np.ndarray:
+        """Criteria scores of every (question, answer) pair as a (n, len(CRITERIA)) array"""
+        grader = self.grader
+        question_ids = [str(question_id) for question_id in question_ids]
+        unknown = set(question_ids) - set(self._offsets)
+        if unknown:
+            raise ValueError(f"No exemplar answers for question(s): {', '.join(sorted(unknown))}")
+
+        students = grader._analyze_all(list(answers))
+        embeddings = None
+        if answers and self._embeddings is not None and grader.use_transformer:
+            try:
+                # Every answer in the exam is encoded in one call, whatever its question
+                embeddings = _unit_rows(grader._encode(list(answers), batch_size).astype(np.float32))
+            except Exception as e:
+                grader.fall_back_to_lexical(e)
+
+        by_question: Dict[str, List[int]] = {}
+        for row, question_id in enumerate(question_ids):
+            by_question.setdefault(question_id, []).append(row)
+
+        matrix = np.empty((len(question_ids), len(CRITERIA)))
+        with grader.stats.timer('assess'):
+            for question_id, rows in by_question.items():
+                similarities = self._exemplar_similarities(question_id, rows, embeddings, students)
+                k = min(self.top_k, similarities.shape[1])
+                if k == 1:
+                    accuracy = similarities.max(axis=1)
+                else:
+                    accuracy = -np.partition(-similarities, k - 1, axis=1)[:, :k].mean(axis=1)
+                best = self._offsets[question_id][0] + similarities.argmax(axis=1)
+                matrix[rows, 0] = accuracy
+                matrix[rows, 1] = [
+                    grader._completeness_score(students[row], self._features[exemplar])
+                    for row, exemplar in zip(rows, best.tolist())
+                ]
+                matrix[rows, 2] = [grader._clarity_score(students[row]) for row in rows]
+                matrix[rows, 3] = [grader._structure_score(students[row]) for row in rows]
+        return matrix
+
+    def grade(self,
+              question_ids: Sequence[str],
+              answers: Sequence[str],
+              batch_size: Optional[int] = None) -> GradingResults:
+        """Grade answers to any mix of questions in one batched pass"""
+        matrix = self.score_matrix(question_ids, answers, batch_size)
+        self.grader.stats.increment('texts_graded', len(matrix))
+        return GradingResults.from_scores(matrix, self.grader.feedback_criteria, self.grader.feedback_thresholds)
+
+    def grade_exam(self,
+                   submissions: Mapping[str, Mapping[str, str]],
+                   batch_size: Optional[int] = None) -> Dict[str, Dict[str, GradeResult]]:
+        """Grade whole exams: student_id -> question_id -> (grade, feedback, scores)"""
+        keys = [
+            (str(student_id), str(question_id))
+            for student_id, answers in submissions.items()
+            for question_id in answers
+        ]
+        answers = [
+            answer
+            for student_answers in submissions.values()
+            for answer in student_answers.values()
+        ]
+        results = self.grade([question_id for _, question_id in keys], answers, batch_size)
+        graded: Dict[str, Dict[str, GradeResult]] = {str(student_id): {} for student_id in submissions}
+        for (student_id, question_id), result in zip(keys, results):
+            graded[student_id][question_id] = result
+        return graded
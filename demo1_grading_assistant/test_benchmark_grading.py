@@ -0,0 +1,59 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import benchmark_grading
+from benchmark_grading import compare, lexical_memory_benchmark, make_corpus, run_benchmarks, throughput_by_length
+
+class TestBenchmarkGrading(unittest.TestCase):
+    def test_corpus_is_reproducible(self):
+        self.assertEqual(make_corpus(5, 'short'), make_corpus(5, 'short'))
+        essays = make_corpus(3, 'essay')
+        self.assertTrue(all(len(essay.split()) >= 200 for essay in essays))
+    
+    def test_report_covers_every_case(self):
+        report = run_benchmarks(sizes=[10], lengths=['short'], modes=['fallback', 'embedder'], repeat=1)
+        names = {(result['name'], result['mode']) for result in report['results']}
+        self.assertIn(('_cosine_similarity_fallback', 'fallback'), names)
+        self.assertIn(('grade_multiple_responses', 'embedder'), names)
+        self.assertEqual(len(names), 13)
+        json.dumps(report)
+    
+    def test_memory_benchmark_compares_identical_scores(self):
+        report = lexical_memory_benchmark(200)
+        self.assertTrue(report['identical_scores'])
+        self.assertEqual(set(report['pipelines']), {'per_answer', 'interned'})
+        self.assertGreater(report['pipelines']['per_answer']['peak_bytes'], 0)
+        json.dumps(report)
+    
+    def test_essay_throughput_next_to_short(self):
+        report = run_benchmarks(sizes=[5], lengths=['short', 'essay'], modes=['embedder'], repeat=1,
+                                cases=['grade_multiple_responses'])
+        row, = throughput_by_length(report)
+        self.assertGreater(row['short_answers_per_sec'], 0)
+        self.assertGreater(row['essay_words_per_sec'], 0)
+    
+    def test_compare_flags_regressions(self):
+        baseline = {'results': [{'name': 'x', 'mode': 'fallback', 'length': 'short', 'size': 10, 'seconds_min': 1.0}]}
+        slower = {'results': [{'name': 'x', 'mode': 'fallback', 'length': 'short', 'size': 10, 'seconds_min': 1.5}]}
+        self.assertEqual(len(compare(baseline, slower, tolerance=0.2)), 1)
+        self.assertEqual(compare(baseline, slower, tolerance=0.6), [])
+    
+    def test_cli_writes_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            with redirect_stdout(io.StringIO()):
+                code = benchmark_grading.main(['--sizes', '10', '--lengths', 'short', '--modes', 'fallback',
+                                               '--cases', 'grade_response', '--repeat', '1', '-o', output])
+                self.assertEqual(code, 0)
+                self.assertEqual(benchmark_grading.main(['--sizes', '10', '--lengths', 'short', '--modes', 'fallback',
+                                                         '--cases', 'grade_response', '--repeat', '1',
+                                                         '-o', output + '.2', '--compare', output,
+                                                         '--tolerance', '1000']), 0)
+            with open(output, encoding='utf-8') as f:
+                self.assertEqual(len(json.load(f)['results']), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+import bulk_grade
+from grading_assistant import GradingAssistant
+
+class TestBulkGrade(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.submissions = [
+            {'student_id': 's1', 'question_id': 'q1', 'answer': "The Earth revolves around the Sun."},
+            {'student_id': 's2', 'question_id': 'q2', 'answer': "Water boils at 100 degrees Celsius."},
+            {'student_id': 's3', 'question_id': 'q1', 'answer': "The Sun orbits the Earth."},
+            {'student_id': 's4', 'question_id': 'q1', 'answer': ""}
+        ]
+        self.references = {
+            'q1': "The Earth orbits around the Sun.",
+            'q2': "Water boils at 100 degrees Celsius at sea level."
+        }
+    
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+    
+    def write_csv(self, name, rows):
+        with open(self.path(name), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return self.path(name)
+    
+    def write_jsonl(self, name, rows):
+        with open(self.path(name), 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        return self.path(name)
+    
+    def run_cli(self, *argv):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            code = bulk_grade.main(list(argv) + ['--no-transformer'])
+        return code, stderr.getvalue()
+    
+    def test_stream_matches_grade_response_in_input_order(self):
+        grader = GradingAssistant()
+        grader.use_transformer = False
+        batches = list(bulk_grade.grade_stream(grader, iter(self.submissions), self.references, batch_size=3))
+        self.assertEqual([len(batch) for batch in batches], [3, 1])
+        results = [result for batch in batches for result in batch]
+        self.assertEqual([result['student_id'] for result in results], ['s1', 's2', 's3', 's4'])
+        for row, result in zip(self.submissions, results):
+            grade, feedback, scores = grader.grade_response(row['answer'], self.references[row['question_id']])
+            self.assertEqual(result['grade'], grade)
+            self.assertEqual(result['feedback'], feedback)
+            self.assertEqual(result['completeness'], scores['completeness'])
+    
+    def test_csv_to_jsonl(self):
+        submissions = self.write_csv('submissions.csv', self.submissions)
+        references = self.write_csv(
+            'references.csv',
+            [{'question_id': q, 'reference_answer': r} for q, r in self.references.items()]
+        )
+        code, stderr = self.run_cli(submissions, '--references', references,
+                                    '-o', self.path('results.jsonl'), '--batch-size', '2')
+        self.assertEqual(code, 0)
+        self.assertIn("answers/sec", stderr)
+        with open(self.path('results.jsonl'), encoding='utf-8') as f:
+            results = [json.loads(line) for line in f]
+        self.assertEqual([result['student_id'] for result in results], ['s1', 's2', 's3', 's4'])
+        self.assertEqual(set(results[0]), set(bulk_grade.RESULT_FIELDS))
+    
+    def test_repeated_questions_become_exemplars(self):
+        submissions = self.write_csv('submissions.csv', self.submissions)
+        references = self.write_csv('references.csv', [
+            {'question_id': 'q1', 'reference_answer': "The Earth orbits around the Sun."},
+            {'question_id': 'q1', 'reference_answer': "The Sun orbits the Earth."},
+            {'question_id': 'q2', 'reference_answer': self.references['q2']}
+        ])
+        self.assertEqual(len(bulk_grade.load_question_bank(references)['q1']), 2)
+        code, _ = self.run_cli(submissions, '--references', references, '-o', self.path('results.jsonl'))
+        self.assertEqual(code, 0)
+        with open(self.path('results.jsonl'), encoding='utf-8') as f:
+            results = [json.loads(line) for line in f]
+        # s3 matches the second exemplar word for word
+        self.assertAlmostEqual(results[2]['content_accuracy'], 1.0, places=5)
+    
+    def test_jsonl_to_csv_with_single_reference(self):
+        submissions = self.write_jsonl('submissions.jsonl', self.submissions)
+        code, _ = self.run_cli(submissions, '--reference', self.references['q1'], '-o', self.path('results.csv'))
+        self.assertEqual(code, 0)
+        with open(self.path('results.csv'), newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(all(0 <= int(row['grade']) <= 5 for row in rows))
+    
+    def test_missing_reference_is_reported(self):
+        submissions = self.write_jsonl('submissions.jsonl', self.submissions)
+        references = self.write_jsonl('references.jsonl', [{'question_id': 'q1', 'reference_answer': "x"}])
+        code, stderr = self.run_cli(submissions, '--references', references, '-o', self.path('results.csv'))
+        self.assertEqual(code, 1)
+        self.assertIn("q2", stderr)
+    
+    def test_embedding_cache_persists_between_runs(self):
+        submissions = self.write_jsonl('submissions.jsonl', self.submissions)
+        argv = [submissions, '--reference', self.references['q1'], '--backend', 'hashed',
+                '--embedding-cache', self.path('embeddings.sqlite')]
+        outputs, reports = [], []
+        for name in ('first.jsonl', 'second.jsonl'):
+            stderr = io.StringIO()
+            with redirect_stderr(stderr):
+                self.assertEqual(bulk_grade.main(argv + ['-o', self.path(name)]), 0)
+            reports.append(stderr.getvalue())
+            with open(self.path(name), encoding='utf-8') as f:
+                outputs.append([json.loads(line) for line in f])
+        self.assertTrue(os.path.exists(self.path('embeddings.sqlite')))
+        self.assertIn("0 disk hits", reports[0])
+        # A fresh process finds every answer and the reference on disk
+        self.assertIn("5 disk hits, 0 misses", reports[1])
+        self.assertEqual(outputs[1], outputs[0])
+    
+    def test_embedding_cache_size_must_be_positive(self):
+        code, stderr = self.run_cli(self.write_jsonl('submissions.jsonl', self.submissions),
+                                    '--reference', "x", '-o', self.path('results.csv'),
+                                    '--embedding-cache-size', '0')
+        self.assertEqual(code, 2)
+        self.assertIn("--embedding-cache-size", stderr)
+    
+    def test_incomplete_writer_cannot_be_created(self):
+        class NoWrite(bulk_grade.ResultWriter):
+            pass
+        with self.assertRaises(TypeError):
+            NoWrite(self.path('results.csv'))
+
+if __name__ == '__main__':
+    unittest.main()
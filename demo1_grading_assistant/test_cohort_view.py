@@ -0,0 +1,58 @@
+import json
+import unittest
+import numpy as np
+from benchmark_grading import make_corpus
+from cohort_view import (criterion_histograms, grade_cohort, grade_distribution, page_count,
+                         read_submissions, results_table, table_page)
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA, GradingResults
+
+class TestCohortView(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.use_transformer = False
+        answers = make_corpus(300, 'short', seed=5)
+        lines = ["student_id,answer"] + [f"s{i},\"{answer}\"" for i, answer in enumerate(answers)]
+        self.submissions = read_submissions("\n".join(lines).encode('utf-8'), "cohort.csv")
+        self.reference = make_corpus(1, 'short', seed=6)[0]
+        self.results = grade_cohort(self.grader, self.submissions, self.reference)
+    
+    def test_reads_jsonl_without_student_ids(self):
+        data = "\n".join(json.dumps({'answer': answer}) for answer in ["One.", "Two."]).encode('utf-8')
+        submissions = read_submissions(data, "cohort.jsonl")
+        self.assertEqual(submissions['student_id'].tolist(), ['1', '2'])
+        with self.assertRaises(ValueError):
+            read_submissions(b"student_id\ns1\n", "cohort.csv")
+    
+    def test_results_match_full_grading(self):
+        expected = self.grader.grade_multiple_responses(self.submissions['answer'].tolist(), self.reference)
+        self.assertEqual(self.results.grades.tolist(), [grade for grade, _, _ in expected])
+        self.assertEqual(self.results.feedback(7), expected[7][1])
+    
+    def test_summaries_are_fixed_size(self):
+        self.assertEqual(grade_distribution(self.results).sum(), 300)
+        histograms = criterion_histograms(self.results, bins=10)
+        self.assertEqual(len(histograms), 10 * len(CRITERIA))
+        self.assertTrue((histograms.groupby('criterion')['students'].sum() == 300).all())
+    
+    def test_histograms_count_out_of_range_scores(self):
+        matrix = np.array([[-0.3, 0.5, 0.5, 0.5], [1.0, 0.5, 0.5, 0.5], [0.2, 0.5, 0.5, 0.5]])
+        results = GradingResults.from_scores(matrix, self.grader.feedback_criteria, self.grader.feedback_thresholds)
+        histograms = criterion_histograms(results, bins=10)
+        accuracy = histograms[histograms['criterion'] == 'content_accuracy']['students'].tolist()
+        self.assertEqual(sum(accuracy), 3)
+        self.assertEqual((accuracy[0], accuracy[-1]), (1, 1))
+    
+    def test_sorted_pages_keep_submission_positions(self):
+        table = results_table(self.submissions, self.results)
+        self.assertEqual(page_count(len(table), 50), 6)
+        first = table_page(table, 'grade', False, 1, 50)
+        self.assertEqual(len(first), 50)
+        self.assertEqual(first['grade'].max(), self.results.grades.max())
+        self.assertTrue(np.all(np.diff(first['grade'].to_numpy().astype(int)) <= 0))
+        position = int(first.index[0])
+        self.assertEqual(first['student_id'].iloc[0], f"s{position}")
+        self.assertEqual(len(table_page(table, 'student_id', True, 6, 50)), 50)
+
+if __name__ == '__main__':
+    unittest.main()
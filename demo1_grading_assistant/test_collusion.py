@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+import bulk_grade
+from collusion import collusion_pairs, find_similar_submissions
+from grading_assistant import GradingAssistant
+from test_grading_assistant import StubModel
+
+class TestCollusion(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.use_transformer = False
+        self.answers = [
+            "The mitochondria produces energy for the cell through respiration.",
+            "Photosynthesis happens in the chloroplast of plant cells.",
+            "The mitochondria produces energy for the cell through respiration!",
+            "Cells divide by mitosis.",
+            "Photosynthesis happens in chloroplasts of the plant cells."
+        ]
+    
+    def test_lexical_neighbors_match_brute_force(self):
+        neighbors = find_similar_submissions(self.grader, self.answers, threshold=0.5, top_k=2, block_size=2)
+        for i, row in enumerate(neighbors):
+            expected = sorted(
+                ((j, self.grader._cosine_similarity_fallback(self.answers[i], other))
+                 for j, other in enumerate(self.answers) if j != i),
+                key=lambda item: -item[1]
+            )[:2]
+            expected = [(j, s) for j, s in expected if s >= 0.5]
+            self.assertEqual([j for j, _ in row], [j for j, _ in expected])
+            for (_, got), (_, want) in zip(row, expected):
+                self.assertAlmostEqual(got, want)
+    
+    def test_pairs_are_unique_and_sorted(self):
+        pairs = collusion_pairs(find_similar_submissions(self.grader, self.answers, threshold=0.6))
+        self.assertEqual([(i, j) for i, j, _ in pairs], [(0, 2), (1, 4)])
+        self.assertGreaterEqual(pairs[0][2], pairs[1][2])
+    
+    def test_embedding_path(self):
+        self.grader.model = StubModel()
+        self.grader.use_transformer = True
+        neighbors = find_similar_submissions(self.grader, self.answers, threshold=0.99, top_k=1)
+        self.assertEqual(neighbors[0][0][0], 2)
+        self.assertEqual(self.grader.model.encode_calls, 1)
+    
+    def test_small_inputs(self):
+        self.assertEqual(find_similar_submissions(self.grader, []), [])
+        self.assertEqual(find_similar_submissions(self.grader, ["only one"]), [[]])
+    
+    def test_cli_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            submissions = os.path.join(directory, 'submissions.jsonl')
+            with open(submissions, 'w', encoding='utf-8') as f:
+                for i, answer in enumerate(self.answers):
+                    f.write(json.dumps({'student_id': f's{i}', 'question_id': 'q1', 'answer': answer}) + '\n')
+            report = os.path.join(directory, 'collusion.csv')
+            with redirect_stderr(io.StringIO()):
+                code = bulk_grade.main([
+                    submissions, '--reference', "Cells make energy.", '-o', os.path.join(directory, 'out.csv'),
+                    '--collusion-report', report, '--collusion-threshold', '0.6', '--no-transformer'
+                ])
+            self.assertEqual(code, 0)
+            with open(report, newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            self.assertEqual([(row['student_id'], row['similar_student_id']) for row in rows], [('s0', 's2'), ('s1', 's4')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from dedup import MinHasher, find_duplicates, grade_deduplicated, normalize_answer
+from grading_assistant import GradingAssistant
+
+class TestDedup(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.use_transformer = False
+        self.reference = "Photosynthesis converts light energy into chemical energy stored in glucose."
+        self.answers = [
+            "Photosynthesis converts light energy into chemical energy stored in glucose.",
+            "Plants eat sunlight.",
+            "  Photosynthesis converts light energy\ninto chemical energy stored in glucose. ",
+            "photosynthesis converts light energy into chemical energy stored in glucose",
+            "Plants eat sunlight.",
+            "Mitochondria are the powerhouse of the cell."
+        ]
+    
+    def test_normalization_only_touches_whitespace(self):
+        self.assertEqual(normalize_answer("  A  b\n c "), "A b c")
+        self.assertNotEqual(normalize_answer("A b"), normalize_answer("a b"))
+    
+    def test_exact_groups(self):
+        dedup = find_duplicates(self.answers)
+        self.assertEqual(dedup.duplicate_groups(), [[0, 2], [1, 4]])
+        self.assertEqual(dedup.saved, 2)
+        self.assertEqual(dedup.summary()['unique'], 4)
+    
+    def test_exact_dedup_scores_identical_to_full_grading(self):
+        results, dedup = grade_deduplicated(self.grader, self.answers, self.reference)
+        self.assertEqual(results, self.grader.grade_multiple_responses(self.answers, self.reference))
+        self.assertEqual(dedup.saved, 2)
+    
+    def test_near_duplicates_grouped(self):
+        dedup = find_duplicates(self.answers, near=True)
+        self.assertIn([0, 2, 3], dedup.duplicate_groups())
+        self.assertIn([5], dedup.groups)
+        results, _ = grade_deduplicated(self.grader, self.answers, self.reference, near=True)
+        self.assertEqual(results[3], results[0])
+    
+    def test_minhash_is_deterministic(self):
+        first = MinHasher().signature(self.answers[0])
+        second = MinHasher().signature(self.answers[0])
+        self.assertEqual(first.tolist(), second.tolist())
+        self.assertIsNone(MinHasher().signature("..."))
+
+if __name__ == '__main__':
+    unittest.main()
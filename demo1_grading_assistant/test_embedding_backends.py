@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from contextlib import redirect_stdout
+import numpy as np
+import compare_backends
+from embedding_backends import (EmbeddingBackend, HashedNgramBackend, QuantizedBackend, SentenceTransformerBackend,
+                                create_backend)
+from embedding_cache import EmbeddingCache
+from grading_assistant import GradingAssistant
+
+class TestEmbeddingBackends(unittest.TestCase):
+    def test_hashed_backend_is_deterministic(self):
+        first = HashedNgramBackend().encode(["The sun is a star."])
+        second = HashedNgramBackend().encode(["The sun is a star."])
+        self.assertEqual(first.tolist(), second.tolist())
+        self.assertEqual(first.shape, (1, 384))
+        self.assertEqual(first.dtype, np.float32)
+        # Five unigrams and four bigrams
+        self.assertEqual(first.sum(), 9)
+    
+    def test_word_order_matters_with_bigrams(self):
+        backend = HashedNgramBackend(ngram_range=(1, 2))
+        first, second = backend.encode(["dog bites man", "man bites dog"])
+        self.assertNotEqual(first.tolist(), second.tolist())
+        first, second = HashedNgramBackend(ngram_range=(1, 1)).encode(["dog bites man", "man bites dog"])
+        self.assertEqual(first.tolist(), second.tolist())
+    
+    def test_specs_round_trip(self):
+        backend = create_backend('hashed:128:1-3')
+        self.assertIsInstance(backend, HashedNgramBackend)
+        self.assertEqual((backend.dimension, backend.ngram_range), (128, (1, 3)))
+        self.assertEqual(create_backend(backend.name).name, backend.name)
+        with self.assertRaises(ValueError):
+            create_backend('quantized')
+        with self.assertRaises(FileNotFoundError):
+            QuantizedBackend(os.path.join(tempfile.gettempdir(), 'no-such-model'))
+    
+    def test_max_words_follows_model_token_limit(self):
+        backend = SentenceTransformerBackend.__new__(SentenceTransformerBackend)
+        backend.model = SimpleNamespace(max_seq_length=256)
+        self.assertEqual(backend.max_words, 128)
+        self.assertIsNone(HashedNgramBackend().max_words)
+    
+    def test_spearman_uses_average_ranks_for_ties(self):
+        baseline = {'content_accuracy': np.array([0.0, 0.0, 1.0, 1.0]), 'grades': np.zeros(4, dtype=np.int64)}
+        run = {'content_accuracy': np.array([0.1, 0.2, 0.3, 0.4]), 'grades': np.zeros(4, dtype=np.int64)}
+        expected = np.corrcoef([1.5, 1.5, 3.5, 3.5], [1, 2, 3, 4])[0, 1]
+        self.assertAlmostEqual(compare_backends.agreement(baseline, run)['spearman'], expected)
+    
+    def test_incomplete_backend_cannot_be_created(self):
+        class NoDimension(EmbeddingBackend):
+            def _encode(self, texts, batch_size):
+                return np.zeros((len(texts), 2))
+        with self.assertRaises(TypeError):
+            NoDimension()
+    
+    def test_info_reports_throughput(self):
+        backend = HashedNgramBackend()
+        backend.encode(["one answer", "another answer"])
+        info = backend.info()
+        self.assertEqual(info['texts_encoded'], 2)
+        self.assertGreater(info['texts_per_second'], 0)
+        self.assertEqual(info['memory_bytes'], 0)
+    
+    def test_grader_uses_backend(self):
+        backend = HashedNgramBackend()
+        cache = EmbeddingCache()
+        grader = GradingAssistant(backend=backend, embedding_cache=cache)
+        self.assertIsInstance(grader.model, EmbeddingBackend)
+        self.assertEqual(grader.model_name, backend.name)
+        grader.grade_multiple_responses(["The Earth orbits the Sun."], "The Earth orbits around the Sun.")
+        self.assertEqual(backend.texts_encoded, 2)
+        self.assertTrue(grader.use_transformer)
+    
+    def test_blank_answers_score_zero_under_hashed_backend(self):
+        grader = GradingAssistant(backend=HashedNgramBackend())
+        reference = "The Earth orbits around the Sun."
+        for answer in ["", "..."]:
+            grade, _, scores = grader.grade_response(answer, reference)
+            self.assertEqual((grade, scores['content_accuracy']), (0, 0.0), answer)
+        results = grader.grade_multiple_responses(["", "...", "The Earth orbits the Sun."], reference)
+        self.assertEqual([scores['content_accuracy'] for _, _, scores in results[:2]], [0.0, 0.0])
+        columnar = grader.grade_columnar(["", "..."], reference)
+        self.assertEqual(columnar.scores['content_accuracy'].tolist(), [0.0, 0.0])
+        self.assertEqual(grader.grade_columnar(["The Earth orbits the Sun."], "...").scores['content_accuracy'].tolist(), [0.0])
+        self.assertTrue(grader.use_transformer)
+    
+    def test_backend_spec_as_model_name_reaches_workers(self):
+        grader = GradingAssistant(model_name='hashed')
+        answers = ["The Earth orbits the Sun.", "Sun goes around Earth.", "Plants need light.", "Water is wet."]
+        try:
+            parallel = grader.grade_multiple_responses(answers, "The Earth orbits around the Sun.", workers=2)
+        finally:
+            grader.close()
+        self.assertEqual(parallel, grader.grade_multiple_responses(answers, "The Earth orbits around the Sun."))
+    
+    def test_compare_backends(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'comparison.json')
+            with redirect_stdout(io.StringIO()):
+                code = compare_backends.main(['--backends', 'hashed:384:1-1,quantized', '--reference-backend', 'hashed',
+                                              '--size', '50', '-o', output])
+            self.assertEqual(code, 0)
+            with open(output, encoding='utf-8') as f:
+                rows = json.load(f)['backends']
+        reference, unigrams, failed = rows
+        self.assertAlmostEqual(reference['spearman'], 1.0)
+        self.assertEqual(reference['grade_agreement'], 1.0)
+        self.assertGreater(unigrams['pearson'], 0.5)
+        self.assertIn('error', failed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from embedding_cache import EmbeddingCache, normalize_text
+from grading_assistant import GradingAssistant
+from test_grading_assistant import StubModel
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_normalization_keeps_case(self):
+        self.assertEqual(normalize_text("  The sky\n is  blue "), "The sky is blue")
+        self.assertNotEqual(
+            EmbeddingCache.make_key('m', "The sky"),
+            EmbeddingCache.make_key('m', "the sky")
+        )
+    
+    def test_keys_depend_on_model(self):
+        self.assertNotEqual(EmbeddingCache.make_key('a', "text"), EmbeddingCache.make_key('b', "text"))
+    
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put_many('m', ["a", "b", "c"], np.eye(3, dtype=np.float32))
+        found = cache.get_many('m', ["a", "b", "c"])
+        self.assertIsNone(found[0])
+        np.testing.assert_array_equal(found[2], [0, 0, 1])
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+    
+    def test_disk_tier_survives_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'embeddings.sqlite')
+            cache = EmbeddingCache(max_entries=1, path=path)
+            cache.put_many('m', ["a", "b"], np.eye(2, dtype=np.float32))
+            cache.close()
+            
+            reopened = EmbeddingCache(path=path)
+            found = reopened.get_many('m', ["a", "b", "c"])
+            np.testing.assert_array_equal(found[0], [1, 0])
+            np.testing.assert_array_equal(found[1], [0, 1])
+            self.assertIsNone(found[2])
+            self.assertEqual(reopened.stats()['disk_hits'], 2)
+            reopened.close()
+    
+    def test_grader_reuses_cached_embeddings(self):
+        grader = GradingAssistant(embedding_cache=EmbeddingCache())
+        grader.model = StubModel()
+        grader.use_transformer = True
+        students = ["The Earth revolves around the Sun.", "The Sun orbits the Earth."]
+        reference = "The Earth orbits around the Sun."
+        
+        first = grader.grade_multiple_responses(students, reference)
+        calls = grader.model.encode_calls
+        second = grader.grade_multiple_responses(students, reference)
+        
+        self.assertEqual(grader.model.encode_calls, calls)
+        self.assertEqual(first, second)
+        self.assertGreater(grader.embedding_cache.stats()['hits'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
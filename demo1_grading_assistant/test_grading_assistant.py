@@ -1,6 +1,26 @@
+import threading
 import unittest
+from unittest import mock
+import numpy as np
+from embedding_backends import HashedNgramBackend
+import grading_assistant
 from grading_assistant import GradingAssistant
 
+
+class StubModel:
+    """Deterministic offline stand-in for SentenceTransformer"""
+    def __init__(self):
+        self.encode_calls = 0
+        
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.encode_calls += 1
+        embeddings = np.zeros((len(texts), 26), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for char in text.lower():
+                if 'a' <= char <= 'z':
+                    embeddings[row, ord(char) - ord('a')] += 1
+        return embeddings
+
 class TestGradingAssistant(unittest.TestCase):
     def setUp(self):
         self.grader = GradingAssistant()
@@ -72,5 +92,187 @@ class TestGradingAssistant(unittest.TestCase):
         self.assertIsInstance(feedback, str)
         self.assertIn("✓", feedback)  # Should contain positive feedback symbols
 
+
+class TestBatchedGrading(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.model = StubModel()
+        self.grader.use_transformer = True
+        self.reference = "The Earth orbits around the Sun."
+        self.students = [
+            "The Earth revolves around the Sun.",
+            "Earth goes around the Sun in space.",
+            "The Sun orbits the Earth.",
+            "The Earth revolves around the Sun."
+        ]
+    
+    def test_batched_scores_match_per_answer_path(self):
+        batched = self.grader.grade_multiple_responses(self.students, self.reference)
+        for answer, (grade, feedback, scores) in zip(self.students, batched):
+            expected_grade, expected_feedback, expected_scores = self.grader.grade_response(answer, self.reference)
+            self.assertEqual(grade, expected_grade)
+            self.assertEqual(feedback, expected_feedback)
+            for key, value in expected_scores.items():
+                self.assertAlmostEqual(scores[key], value, places=5)
+    
+    def test_reference_encoded_once(self):
+        self.grader.grade_multiple_responses(self.students, self.reference, batch_size=2)
+        self.assertEqual(self.grader.model.encode_calls, 2)
+    
+    def test_empty_batch(self):
+        self.assertEqual(self.grader.grade_multiple_responses([], self.reference), [])
+
+class RecordingModel(StubModel):
+    """StubModel that also keeps every text it was asked to encode"""
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+        
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.texts.extend(texts)
+        return super().encode(texts, batch_size, **kwargs)
+
+class TestChunkedEncoding(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.model = RecordingModel()
+        self.grader.max_chunk_words = 10
+        self.essay = " ".join(f"Sentence number {i} talks about the Sun and the Earth." for i in range(6))
+    
+    def test_short_texts_encoded_whole(self):
+        texts = ["The Earth revolves around the Sun.", "The Sun orbits the Earth."]
+        embeddings = self.grader._encode(texts)
+        self.assertEqual(self.grader.model.texts, texts)
+        self.assertEqual(embeddings.tolist(), StubModel().encode(texts).tolist())
+    
+    def test_window_comes_from_backend_by_default(self):
+        grader = GradingAssistant(backend=HashedNgramBackend())
+        self.assertIsNone(grader.chunk_window())
+        grader.model = RecordingModel()
+        self.assertIsNone(grader.chunk_window())
+        grader.model.max_words = 128
+        self.assertEqual(grader.chunk_window(), 128)
+        grader.max_chunk_words = 0
+        self.assertIsNone(grader.chunk_window())
+        self.assertEqual(self.grader.chunk_window(), 10)
+    
+    def test_long_texts_chunked_sorted_and_pooled(self):
+        texts = ["Short answer.", self.essay]
+        embeddings = self.grader._encode(texts)
+        encoded = self.grader.model.texts
+        self.assertEqual(self.grader.model.encode_calls, 1)
+        self.assertTrue(all(len(chunk.split()) <= 10 for chunk in encoded))
+        lengths = [len(chunk.split()) for chunk in encoded]
+        self.assertEqual(lengths, sorted(lengths))
+        
+        # The essay's vector is the length-weighted mean of its chunk vectors
+        chunks = encoded[1:]
+        weights = np.array([len(chunk.split()) for chunk in chunks], dtype=float)
+        expected = (StubModel().encode(chunks) * weights[:, None]).sum(axis=0) / weights.sum()
+        np.testing.assert_allclose(embeddings[1], expected)
+        np.testing.assert_allclose(embeddings[0], StubModel().encode(["Short answer."])[0])
+        self.assertEqual(self.grader.stats.counters['texts_chunked'], 1)
+    
+    def test_blank_answer_score_independent_of_batch(self):
+        class BlankAwareModel(StubModel):
+            def encode(self, texts, batch_size=32, **kwargs):
+                embeddings = super().encode(texts, batch_size, **kwargs)
+                embeddings[[not text.strip() for text in texts], 0] = 1.0
+                return embeddings
+        self.grader.model = BlankAwareModel()
+        reference = "A sun."
+        alone = self.grader.grade_multiple_responses(["", "short one"], reference)[0][2]['content_accuracy']
+        with_essay = self.grader.grade_multiple_responses(["", self.essay], reference)[0][2]['content_accuracy']
+        self.assertGreater(alone, 0.0)
+        self.assertEqual(with_essay, alone)
+    
+    def test_essay_similar_to_itself(self):
+        self.assertAlmostEqual(self.grader.calculate_similarities([self.essay], self.essay)[0], 1.0, places=5)
+
+class TestLazyModelLoading(unittest.TestCase):
+    def setUp(self):
+        grading_assistant.clear_shared_models()
+        self.addCleanup(grading_assistant.clear_shared_models)
+    
+    def test_model_not_loaded_until_needed(self):
+        with mock.patch.object(grading_assistant, '_create_model', return_value=StubModel()) as create:
+            grader = GradingAssistant()
+            create.assert_not_called()
+            self.assertIsNone(grader.model_load_seconds)
+            grader.calculate_similarity("The sky is blue", "The sky is blue")
+            create.assert_called_once_with('all-MiniLM-L6-v2')
+            self.assertIsNotNone(grader.model_load_seconds)
+    
+    def test_model_shared_between_graders(self):
+        with mock.patch.object(grading_assistant, '_create_model', return_value=StubModel()) as create:
+            first, second = GradingAssistant(), GradingAssistant()
+            self.assertIs(first.model, second.model)
+            create.assert_called_once()
+    
+    def test_load_failure_falls_back(self):
+        with mock.patch.object(grading_assistant, '_create_model', side_effect=OSError("offline")) as create:
+            grader = GradingAssistant(lazy=False)
+            self.assertFalse(grader.use_transformer)
+            self.assertIsNone(grader.model)
+            self.assertGreater(grader.calculate_similarity("The sky is blue", "The sky is blue"), 0.99)
+            GradingAssistant(lazy=False)
+            create.assert_called_once()
+
+class TestParallelGrading(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.use_transformer = False
+        self.addCleanup(self.grader.close)
+        self.reference = "The Earth orbits around the Sun."
+        self.students = [
+            f"Answer {i}: the Earth {'revolves' if i % 2 else 'goes'} around the Sun. " * (i % 4 + 1)
+            for i in range(25)
+        ]
+    
+    def test_workers_match_serial_results_in_order(self):
+        serial = self.grader.grade_multiple_responses(self.students, self.reference)
+        parallel = self.grader.grade_multiple_responses(self.students, self.reference, workers=3)
+        self.assertEqual(parallel, serial)
+    
+    def test_pool_reused_and_weights_forwarded(self):
+        self.grader.grade_multiple_responses(self.students, self.reference, workers=2)
+        pool = self.grader._pool
+        self.grader.feedback_criteria = {'content_accuracy': 1.0, 'completeness': 0.0, 'clarity': 0.0, 'structure': 0.0}
+        parallel = self.grader.grade_multiple_responses(self.students, self.reference, workers=2)
+        self.assertIs(self.grader._pool, pool)
+        self.assertEqual(parallel, self.grader.grade_multiple_responses(self.students, self.reference))
+    
+    def test_serial_fallback_when_pool_fails(self):
+        with mock.patch.object(grading_assistant, 'ProcessPoolExecutor', side_effect=OSError("no processes")):
+            results = self.grader.grade_multiple_responses(self.students, self.reference, workers=4)
+        self.assertEqual(results, self.grader.grade_multiple_responses(self.students, self.reference))
+        self.assertIsNone(self.grader._pool)
+    
+    def test_injected_backend_reaches_workers(self):
+        grader = GradingAssistant()
+        grader.model = StubModel()
+        self.addCleanup(grader.close)
+        serial = grader.grade_multiple_responses(self.students, self.reference)
+        self.assertEqual(grader.grade_multiple_responses(self.students, self.reference, workers=2), serial)
+        self.assertEqual(grader.grade_columnar(self.students, self.reference, workers=2).grades.tolist(),
+                         [grade for grade, _, _ in serial])
+        self.assertEqual(grader.stats.snapshot()['counters']['fallback_events'], 0)
+    
+    def test_unpicklable_backend_grades_serially_and_records_fallback(self):
+        model = StubModel()
+        model.lock = threading.Lock()
+        grader = GradingAssistant()
+        grader.model = model
+        self.addCleanup(grader.close)
+        serial = grader.grade_multiple_responses(self.students, self.reference)
+        with mock.patch('builtins.print'):
+            parallel = grader.grade_multiple_responses(self.students, self.reference, workers=2)
+        self.assertEqual(parallel, serial)
+        self.assertIsNone(grader._pool)
+        snapshot = grader.stats.snapshot()
+        self.assertEqual(snapshot['counters']['fallback_events'], 1)
+        self.assertEqual(snapshot['fallbacks'][0]['stage'], 'parallel')
+        self.assertTrue(grader.use_transformer)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
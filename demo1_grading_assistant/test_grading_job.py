@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from unittest import mock
+import bulk_grade
+import grading_assistant
+from embedding_backends import HashedNgramBackend
+from grading_assistant import GradingAssistant
+from grading_job import CheckpointMismatch, GradingJob, read_rows_from
+from test_grading_assistant import StubModel
+from test_grading_session import FailingAfterModel
+
+
+class Crash(Exception):
+    pass
+
+
+class TestGradingJob(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.input = self.path('submissions.jsonl')
+        self.rows = [{'student_id': f"s{i}", 'answer': f"Answer number {i}."} for i in range(25)]
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(row) + '\n' for row in self.rows)
+        self.checkpoint = self.path('job.checkpoint')
+        self.graded_ids = []
+    
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+    
+    def grade(self, batch, crash_after=None):
+        if crash_after is not None and len(self.graded_ids) >= crash_after:
+            raise Crash()
+        self.graded_ids.extend(row['student_id'] for row in batch)
+        return [{'student_id': row['student_id'], 'length': len(row['answer'])} for row in batch]
+    
+    def job(self, crash_after=None, **options):
+        return GradingJob(self.input, self.checkpoint, lambda batch: self.grade(batch, crash_after),
+                          'jsonl', batch_size=4, checkpoint_every=8, **options)
+    
+    def results(self, job):
+        return [result for results in job.iter_results() for result in results]
+    
+    def test_complete_run(self):
+        job = self.job()
+        self.assertEqual(job.run(), 25)
+        self.assertEqual([result['student_id'] for result in self.results(job)], [row['student_id'] for row in self.rows])
+        self.assertEqual(self.job().run(), 0)
+    
+    def test_resume_skips_checkpointed_answers(self):
+        with self.assertRaises(Crash):
+            self.job(crash_after=12).run()
+        # Two checkpoints of 8 answers would need 16; only the first was written
+        self.graded_ids = []
+        resumed = self.job()
+        self.assertEqual(resumed.run(), 17)
+        self.assertEqual(resumed.resumed_rows, 8)
+        self.assertEqual(self.graded_ids, [row['student_id'] for row in self.rows[8:]])
+        self.assertEqual(len(self.results(resumed)), 25)
+    
+    def test_torn_write_is_discarded(self):
+        with self.assertRaises(Crash):
+            self.job(crash_after=16).run()
+        with open(self.checkpoint, 'ab') as f:
+            f.write(b'{"cursor": 999, "rows"')
+        self.assertEqual(self.job().run(), 9)
+        self.assertEqual(len(self.results(self.job())), 25)
+    
+    def test_changed_input_is_not_resumed(self):
+        with self.assertRaises(Crash):
+            self.job(crash_after=8).run()
+        with open(self.input, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'student_id': 'late', 'answer': "Late answer."}) + '\n')
+        with self.assertRaises(CheckpointMismatch):
+            self.job().run()
+        with self.assertRaises(CheckpointMismatch):
+            GradingJob(self.input, self.checkpoint, self.grade, 'jsonl', fingerprint={'model': 'other'}).run()
+    
+    def test_settings_change_stops_job(self):
+        settings = {'model': 'transformer'}
+        
+        def grade(batch):
+            results = self.grade(batch)
+            if len(self.graded_ids) >= 12:
+                settings['model'] = 'lexical'
+            return results
+        
+        job = GradingJob(self.input, self.checkpoint, grade, 'jsonl', batch_size=4, checkpoint_every=8,
+                         fingerprint={'model': 'transformer'}, current_settings=lambda: dict(settings))
+        with self.assertRaises(CheckpointMismatch):
+            job.run()
+        self.assertEqual(len(self.results(job)), 8)
+        with self.assertRaises(CheckpointMismatch):
+            self.job(fingerprint={'model': 'lexical'}).run()
+        resumed = self.job(fingerprint={'model': 'transformer'})
+        self.assertEqual(resumed.run(), 17)
+        self.assertEqual(len(self.results(resumed)), 25)
+    
+    def test_cli_job_never_checkpoints_fallback_results(self):
+        args = bulk_grade.build_parser().parse_args([self.input, '--reference', "Answer number 3.",
+                                                     '-o', self.path('job.jsonl'), '--checkpoint', self.checkpoint,
+                                                     '--batch-size', '3', '--checkpoint-every', '3'])
+        failing = GradingAssistant()
+        failing.model = FailingAfterModel(calls=5)
+        with mock.patch('builtins.print'), self.assertRaises(CheckpointMismatch):
+            bulk_grade.run_checkpointed_job(args, failing, {}, None)
+        self.assertFalse(failing.use_transformer)
+        
+        grader = GradingAssistant()
+        grader.model = StubModel()
+        self.assertEqual(bulk_grade.run_checkpointed_job(args, grader, {}, None), 25 - 6)
+        with open(self.path('job.jsonl'), encoding='utf-8') as f:
+            content_accuracy = [json.loads(line)['content_accuracy'] for line in f]
+        expected = grader.grade_multiple_responses([row['answer'] for row in self.rows], "Answer number 3.")
+        self.assertEqual(content_accuracy, [scores['content_accuracy'] for _, _, scores in expected])
+    
+    def test_csv_offsets_survive_multiline_fields(self):
+        path = self.path('multiline.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['student_id', 'answer'])
+            writer.writerows([['s1', "Line one.\nLine two."], ['s2', "Single line."], ['s3', "Third,\n answer."]])
+        rows = list(read_rows_from(path, 'csv'))
+        self.assertEqual([row['student_id'] for row, _ in rows], ['s1', 's2', 's3'])
+        self.assertEqual(rows[0][0]['answer'], "Line one.\nLine two.")
+        resumed = list(read_rows_from(path, 'csv', rows[0][1]))
+        self.assertEqual([row for row, _ in resumed], [row for row, _ in rows[1:]])
+    
+    def test_cli_checkpoint_matches_plain_run(self):
+        references = self.path('references.csv')
+        with open(references, 'w', newline='', encoding='utf-8') as f:
+            f.write("question_id,reference_answer\n,Answer number 3.\n")
+        code = bulk_grade.main([self.input, '--references', references, '-o', self.path('plain.jsonl'), '--no-transformer'])
+        self.assertEqual(code, 0)
+        arguments = [self.input, '--references', references, '-o', self.path('job.jsonl'), '--no-transformer',
+                     '--checkpoint', self.checkpoint, '--checkpoint-every', '10', '--batch-size', '3']
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            self.assertEqual(bulk_grade.main(arguments), 0)
+            self.assertEqual(bulk_grade.main(arguments), 0)
+        self.assertIn("Resumed after 25 answers", stderr.getvalue())
+        with open(self.path('plain.jsonl'), encoding='utf-8') as plain, open(self.path('job.jsonl'), encoding='utf-8') as job:
+            self.assertEqual(plain.read(), job.read())
+    
+    def test_cli_checkpoint_rejects_unknown_input_format(self):
+        stderr = io.StringIO()
+        with redirect_stderr(stderr):
+            code = bulk_grade.main([self.path('submissions.txt'), '--reference', "Answer.", '-o', self.path('out.csv'),
+                                    '--checkpoint', self.checkpoint, '--no-transformer'])
+        self.assertEqual(code, 2)
+        self.assertTrue(stderr.getvalue().startswith("Error: "))
+    
+    def test_fingerprint_reflects_failed_model_load(self):
+        args = bulk_grade.build_parser().parse_args([self.input, '--reference', "Answer.", '-o', self.path('out.csv')])
+        grading_assistant.clear_shared_models()
+        self.addCleanup(grading_assistant.clear_shared_models)
+        with mock.patch.object(grading_assistant, '_create_model', side_effect=OSError("offline")), \
+                mock.patch('builtins.print'):
+            fingerprint = bulk_grade.job_fingerprint(args, GradingAssistant())
+        self.assertEqual((fingerprint['model'], fingerprint['max_chunk_words']), ('lexical', None))
+        
+        grader = GradingAssistant(backend=HashedNgramBackend())
+        grader.max_chunk_words = 50
+        fingerprint = bulk_grade.job_fingerprint(args, grader)
+        self.assertEqual((fingerprint['model'], fingerprint['max_chunk_words']), (grader.model_name, 50))
+        grader.feedback_thresholds = {'strong': 0.9, 'fair': 0.5}
+        self.assertNotEqual(bulk_grade.job_fingerprint(args, grader), fingerprint)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+from benchmark_grading import make_corpus
+from dedup import grade_deduplicated
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA, GradingResults
+from test_grading_assistant import StubModel
+
+
+class TestGradingResults(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.model = StubModel()
+        self.answers = make_corpus(200, 'short', seed=3)
+        self.reference = make_corpus(1, 'short', seed=4)[0]
+    
+    def assertMatchesLegacy(self, results, legacy):
+        self.assertEqual(len(results), len(legacy))
+        for (grade, feedback, scores), (expected_grade, expected_feedback, expected_scores) in zip(results, legacy):
+            self.assertEqual(grade, expected_grade)
+            self.assertEqual(feedback, expected_feedback)
+            for criterion in CRITERIA:
+                self.assertAlmostEqual(scores[criterion], expected_scores[criterion], places=6)
+    
+    def test_matches_grade_multiple_responses(self):
+        results = self.grader.grade_columnar(self.answers, self.reference)
+        self.assertEqual(results.grades.dtype, np.int8)
+        self.assertTrue(all(column.dtype == np.float32 for column in results.scores.values()))
+        self.assertMatchesLegacy(results, self.grader.grade_multiple_responses(self.answers, self.reference))
+    
+    def test_indexing(self):
+        results = self.grader.grade_columnar(self.answers, self.reference)
+        legacy = list(results)
+        self.assertEqual(results[5], legacy[5])
+        self.assertEqual(list(results[10:20]), legacy[10:20])
+        self.assertEqual(list(results[np.array([3, 3, 0])]), [legacy[3], legacy[3], legacy[0]])
+    
+    def test_feedback_decided_at_full_precision(self):
+        # Rounds up to 0.8 as float32, but is still below the strong threshold
+        matrix = np.full((1, len(CRITERIA)), 0.79999999)
+        results = GradingResults.from_scores(matrix, self.grader.feedback_criteria, self.grader.feedback_thresholds)
+        self.assertEqual(results.feedback(0), self.grader.generate_detailed_feedback(dict(zip(CRITERIA, matrix[0]))))
+    
+    def test_pandas_export_shares_memory(self):
+        results = self.grader.grade_columnar(self.answers, self.reference)
+        frame = results.to_pandas()
+        self.assertEqual(list(frame.columns), ['grade', *CRITERIA])
+        self.assertTrue(np.shares_memory(frame['grade'].to_numpy(), results.grades))
+        self.assertTrue(np.shares_memory(frame['clarity'].to_numpy(), results.scores['clarity']))
+        self.assertEqual(results.to_pandas(feedback=True)['feedback'][7], results.feedback(7))
+    
+    def test_arrow_export(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest("pyarrow is not installed")
+        table = self.grader.grade_columnar(self.answers, self.reference).to_arrow()
+        self.assertEqual(table.num_rows, len(self.answers))
+    
+    def test_parallel_matches_serial(self):
+        self.grader.use_transformer = False
+        try:
+            parallel = self.grader.grade_columnar(self.answers, self.reference, workers=2)
+        finally:
+            self.grader.close()
+        self.assertEqual(list(parallel), list(self.grader.grade_columnar(self.answers, self.reference)))
+    
+    def test_deduplicated_columnar(self):
+        answers = self.answers[:20] + self.answers[:20]
+        results, _ = grade_deduplicated(self.grader, answers, self.reference, columnar=True)
+        self.assertIsInstance(results, GradingResults)
+        self.assertMatchesLegacy(results, self.grader.grade_multiple_responses(answers, self.reference))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+from embedding_cache import EmbeddingCache
+from grading_assistant import GradingAssistant
+from grading_service import GradingService, ServiceOverloaded, serve
+from test_grading_assistant import StubModel
+
+REFERENCE = "The Earth orbits around the Sun."
+ANSWERS = [
+    "The Earth revolves around the Sun.",
+    "Earth goes around the Sun in space.",
+    "The Sun orbits the Earth.",
+    "Planets move.",
+    "The Earth orbits the Sun once a year."
+]
+
+
+async def http_request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(content)
+
+
+class TestGradingService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.model = StubModel()
+    
+    async def test_concurrent_requests_share_one_batch(self):
+        async with GradingService(self.grader, max_batch_size=16, max_wait=0.05) as service:
+            results = await asyncio.gather(*(service.grade(answer, REFERENCE) for answer in ANSWERS))
+        # One encode for the reference and one for all merged answers
+        self.assertEqual(self.grader.model.encode_calls, 2)
+        self.assertEqual(service.batches_run, 1)
+        expected = GradingAssistant()
+        expected.model = StubModel()
+        self.assertEqual(results, expected.grade_multiple_responses(ANSWERS, REFERENCE))
+    
+    async def test_max_batch_size_splits_batches(self):
+        async with GradingService(self.grader, max_batch_size=2, max_wait=0.05) as service:
+            await asyncio.gather(*(service.grade(answer, REFERENCE) for answer in ANSWERS))
+            self.assertEqual(service.batches_run, 3)
+            latency = service.latency_percentiles()
+        self.assertEqual(latency['count'], len(ANSWERS))
+        self.assertLessEqual(latency['p50'], latency['p99'])
+    
+    async def test_stats_report_embedding_cache(self):
+        self.assertIsNone(GradingService(self.grader).stats()['embedding_cache'])
+        self.grader.embedding_cache = EmbeddingCache(max_entries=100)
+        async with GradingService(self.grader, max_wait=0.05) as service:
+            await asyncio.gather(*(service.grade(answer, REFERENCE) for answer in ANSWERS))
+            await service.grade(ANSWERS[0], REFERENCE)
+            cache_stats = service.stats()['embedding_cache']
+        self.assertEqual(cache_stats['misses'], len(ANSWERS) + 1)
+        self.assertEqual(cache_stats['hits'], 2)
+    
+    async def test_backpressure_rejects_when_full(self):
+        service = GradingService(self.grader, max_queue_size=1)
+        waiting = asyncio.ensure_future(service.grade(ANSWERS[0], REFERENCE))
+        await asyncio.sleep(0)
+        with self.assertRaises(ServiceOverloaded):
+            await service.grade(ANSWERS[1], REFERENCE, wait=False)
+        self.assertEqual(service.stats()['requests_rejected'], 1)
+        await service.start()
+        self.assertEqual(len(await waiting), 3)
+        await service.stop()
+    
+    async def test_http_front_end(self):
+        self.grader.use_transformer = False
+        service = GradingService(self.grader, max_wait=0.01)
+        server = await serve(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        
+        async def request(method, path, payload=None):
+            return await http_request(port, method, path, payload)
+        
+        try:
+            status, body = await request('POST', '/grade', {'student_answer': ANSWERS[0], 'reference_answer': REFERENCE})
+            self.assertEqual(status, 200)
+            self.assertEqual(body['grade'], self.grader.grade_response(ANSWERS[0], REFERENCE)[0])
+            status, body = await request('GET', '/stats')
+            self.assertEqual(status, 200)
+            self.assertEqual(body['requests_completed'], 1)
+            status, _ = await request('POST', '/grade', {'student_answer': "missing reference"})
+            self.assertEqual(status, 400)
+            status, _ = await request('GET', '/nowhere')
+            self.assertEqual(status, 404)
+            with mock.patch.object(self.grader, 'grade_multiple_responses', side_effect=RuntimeError("model crashed")):
+                status, body = await request('POST', '/grade', {'student_answer': ANSWERS[0], 'reference_answer': REFERENCE})
+            self.assertEqual(status, 500)
+            self.assertIn("model crashed", body['error'])
+        finally:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+    
+    async def test_bad_request_does_not_fail_its_batch(self):
+        with self.assertRaises(TypeError):
+            await GradingService(self.grader).grade(123, REFERENCE)
+        service = GradingService(self.grader, max_wait=0.05)
+        server = await serve(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            payloads = [{'student_answer': answer, 'reference_answer': REFERENCE} for answer in ANSWERS[:2]]
+            payloads.insert(1, {'student_answer': 123, 'reference_answer': REFERENCE})
+            responses = await asyncio.gather(*(http_request(port, 'POST', '/grade', payload) for payload in payloads))
+            self.assertEqual([status for status, _ in responses], [200, 400, 200])
+            self.assertIn("student_answer must be a string", responses[1][1]['error'])
+            self.assertEqual(service.batches_run, 1)
+            
+            # A TypeError raised by the grader itself is a server error, not a bad request
+            with mock.patch.object(self.grader, 'grade_multiple_responses', side_effect=TypeError("bad model output")):
+                status, _ = await http_request(port, 'POST', '/grade', payloads[0])
+            self.assertEqual(status, 500)
+        finally:
+            server.close()
+            await server.wait_closed()
+            await service.stop()
+    
+    async def test_failing_reference_group_leaves_other_groups(self):
+        original = self.grader.grade_multiple_responses
+        
+        def grade(answers, reference, assignment_type="short_answer"):
+            if reference == "broken":
+                raise RuntimeError("model crashed")
+            return original(answers, reference, assignment_type)
+        
+        with mock.patch.object(self.grader, 'grade_multiple_responses', side_effect=grade):
+            async with GradingService(self.grader, max_wait=0.05) as service:
+                results = await asyncio.gather(service.grade(ANSWERS[0], REFERENCE), service.grade(ANSWERS[1], "broken"),
+                                               return_exceptions=True)
+        self.assertEqual(len(results[0]), 3)
+        self.assertIsInstance(results[1], RuntimeError)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA, compute_grades
+from embedding_backends import HashedNgramBackend
+from grading_session import GradingSession
+from test_grading_assistant import StubModel
+
+class TextCountingModel(StubModel):
+    def __init__(self):
+        super().__init__()
+        self.texts_encoded = 0
+    
+    def encode(self, texts, batch_size=32, **kwargs):
+        self.texts_encoded += len(texts)
+        return super().encode(texts, batch_size, **kwargs)
+
+
+class FailingAfterModel(StubModel):
+    def __init__(self, calls):
+        super().__init__()
+        self.calls = calls
+    
+    def encode(self, texts, batch_size=32, **kwargs):
+        if self.encode_calls >= self.calls:
+            raise RuntimeError("CUDA out of memory")
+        return super().encode(texts, batch_size, **kwargs)
+
+
+REFERENCE = "The Earth orbits around the Sun once every year."
+ANSWERS = {
+    's1': "The Earth revolves around the Sun.",
+    's2': "Earth goes around the Sun in space, taking one year for each orbit around it.",
+    's3': "The Sun orbits the Earth.",
+    's4': "Sun."
+}
+
+
+class TestGradingSession(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.model = StubModel()
+        self.session = GradingSession(self.grader, REFERENCE)
+        self.session.update_answers(ANSWERS)
+    
+    def assertMatchesFullGrading(self, reference):
+        fresh = GradingAssistant()
+        fresh.model = StubModel()
+        fresh.feedback_criteria = dict(self.session.feedback_criteria)
+        fresh.feedback_thresholds = dict(self.session.feedback_thresholds)
+        expected = fresh.grade_multiple_responses(list(self.session.answers.values()), reference)
+        for (_, grade, feedback, scores), (expected_grade, expected_feedback, expected_scores) in zip(
+                self.session.results(), expected):
+            self.assertEqual(grade, expected_grade)
+            self.assertEqual(feedback, expected_feedback)
+            for criterion in CRITERIA:
+                self.assertAlmostEqual(scores[criterion], expected_scores[criterion], places=5)
+    
+    def test_initial_results_match_full_grading(self):
+        self.assertEqual([result[0] for result in self.session.results()], list(ANSWERS))
+        self.assertMatchesFullGrading(REFERENCE)
+    
+    def test_weight_and_threshold_changes_need_no_model_calls(self):
+        calls = self.grader.model.encode_calls
+        self.session.set_weights({'content_accuracy': 0.1, 'completeness': 0.1, 'clarity': 0.4, 'structure': 0.4})
+        self.session.set_feedback_thresholds(strong=0.9, fair=0.3)
+        self.assertEqual(self.grader.model.encode_calls, calls)
+        self.assertMatchesFullGrading(REFERENCE)
+    
+    def test_shared_grader_settings_are_not_changed(self):
+        weights = dict(self.grader.feedback_criteria)
+        thresholds = dict(self.grader.feedback_thresholds)
+        self.session.set_weights({'content_accuracy': 0.1, 'completeness': 0.1, 'clarity': 0.4, 'structure': 0.4})
+        self.session.set_feedback_thresholds(strong=0.9, fair=0.3)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.sqlite')
+            session = GradingSession(self.grader, REFERENCE, path=path)
+            session.set_weights({'content_accuracy': 0.7, 'completeness': 0.1, 'clarity': 0.1, 'structure': 0.1})
+            session.close()
+            reopened = GradingSession(self.grader, path=path)
+            self.assertEqual(reopened.feedback_criteria['content_accuracy'], 0.7)
+            reopened.close()
+        self.assertEqual(self.grader.feedback_criteria, weights)
+        self.assertEqual(self.grader.feedback_thresholds, thresholds)
+    
+    def test_unchanged_answers_are_not_rescored(self):
+        self.assertEqual(self.session.update_answers(ANSWERS), 0)
+        self.assertEqual(self.session.update_answers({'s3': "The Earth orbits the Sun.", 's5': "New answer."}), 2)
+        self.assertEqual(self.session.last_rescored['answers'], 2)
+        self.assertEqual(len(self.session.results()), 5)
+        self.assertMatchesFullGrading(REFERENCE)
+    
+    def test_reference_change_keeps_text_only_criteria(self):
+        clarity = self.session.scores[:, CRITERIA.index('clarity')].copy()
+        self.session.set_reference("Planets orbit stars because of gravity.")
+        np.testing.assert_array_equal(self.session.scores[:, CRITERIA.index('clarity')], clarity)
+        self.assertEqual(self.session.last_rescored['reference_criteria'], len(ANSWERS))
+        self.assertMatchesFullGrading("Planets orbit stars because of gravity.")
+    
+    def test_reference_change_encodes_only_the_reference(self):
+        answers = {f"a{i}": f"Answer number {i} says the Earth orbits the Sun." for i in range(100)}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.sqlite')
+            grader = GradingAssistant()
+            grader.model = TextCountingModel()
+            session = GradingSession(grader, REFERENCE, path=path)
+            session.update_answers(answers)
+            self.assertEqual(grader.model.texts_encoded, 101)
+            session.set_reference("Planets orbit stars because of gravity.")
+            self.assertEqual(grader.model.texts_encoded, 102)
+            session.update_answers({'a0': "Edited answer."})
+            self.assertEqual(grader.model.texts_encoded, 104)
+            session.close()
+            
+            # Stored embeddings survive reopening the session file
+            grader = GradingAssistant()
+            grader.model = TextCountingModel()
+            reopened = GradingSession(grader, "The Moon orbits the Earth.", path=path)
+            self.assertEqual(grader.model.texts_encoded, 1)
+            self.session = reopened
+            self.assertMatchesFullGrading("The Moon orbits the Earth.")
+            reopened.close()
+    
+    def test_embeddings_from_another_model_are_discarded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.sqlite')
+            session = GradingSession(self.grader, REFERENCE, path=path)
+            session.update_answers(ANSWERS)
+            session.close()
+            
+            grader = GradingAssistant(model_name='other-model')
+            grader.model = TextCountingModel()
+            reopened = GradingSession(grader, "The Moon orbits the Earth.", path=path)
+            self.assertEqual(grader.model.texts_encoded, len(ANSWERS) + 1)
+            reopened.close()
+    
+    def test_reopening_with_another_scorer_rescores_content_accuracy(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.sqlite')
+            session = GradingSession(GradingAssistant(backend=HashedNgramBackend(ngram_range=(2, 2))), REFERENCE, path=path)
+            session.update_answers(ANSWERS)
+            session.close()
+            
+            lexical = GradingAssistant()
+            lexical.use_transformer = False
+            reopened = GradingSession(lexical, path=path)
+            self.assertEqual(reopened.scorer, 'lexical')
+            self.assertEqual(reopened.last_rescored['reference_criteria'], len(ANSWERS))
+            reopened.update_answers({'copy': ANSWERS['s2']})
+            results = {answer_id: (grade, scores) for answer_id, grade, _, scores in reopened.results()}
+            self.assertEqual(results['copy'], results['s2'])
+            reopened.close()
+    
+    def test_fallback_mid_session_rescores_every_answer(self):
+        grader = GradingAssistant()
+        grader.model = FailingAfterModel(calls=1)
+        session = GradingSession(grader, REFERENCE)
+        with mock.patch('builtins.print'):
+            session.update_answers(dict(list(ANSWERS.items())[:2]))
+            session.update_answers(dict(list(ANSWERS.items())[2:]))
+        self.assertEqual(session.scorer, 'lexical')
+        lexical = GradingAssistant()
+        lexical.use_transformer = False
+        expected = lexical.grade_multiple_responses(list(ANSWERS.values()), REFERENCE)
+        self.assertEqual([scores for _, _, _, scores in session.results()], [scores for _, _, scores in expected])
+    
+    def test_session_persists(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.sqlite')
+            session = GradingSession(self.grader, REFERENCE, path=path)
+            session.update_answers(ANSWERS)
+            session.set_weights({'content_accuracy': 0.7, 'completeness': 0.1, 'clarity': 0.1, 'structure': 0.1})
+            expected = session.results()
+            session.close()
+            
+            grader = GradingAssistant()
+            grader.model = StubModel()
+            reopened = GradingSession(grader, path=path)
+            self.assertEqual(reopened.results(), expected)
+            self.assertEqual(reopened.update_answers(ANSWERS), 0)
+            self.assertEqual(grader.model.encode_calls, 0)
+            reopened.close()
+    
+    def test_compute_grades_matches_build_result(self):
+        rng = np.random.default_rng(0)
+        matrix = rng.random((500, len(CRITERIA)))
+        grades = compute_grades(matrix, self.grader.feedback_criteria)
+        for row, grade in zip(matrix, grades):
+            self.assertEqual(grade, self.grader._build_result(dict(zip(CRITERIA, row.tolist())))[0])
+    
+    def test_unknown_weight_rejected(self):
+        with self.assertRaises(ValueError):
+            self.session.set_weights({'style': 1.0})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import unittest
+from unittest import mock
+import grading_assistant
+from collusion import find_similar_submissions
+from grading_assistant import GradingAssistant
+from instrumentation import GradingStats, Histogram
+from test_grading_assistant import StubModel
+
+class FailingModel:
+    def encode(self, texts, batch_size=32, **kwargs):
+        raise RuntimeError("CUDA out of memory")
+
+
+class TestGradingStats(unittest.TestCase):
+    def test_histogram_buckets(self):
+        histogram = Histogram((1, 10, float('inf')))
+        for value in (0.5, 5, 50, 1):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.to_dict()['buckets'], {'1': 2, '10': 1, '+Inf': 1})
+    
+    def test_timer_and_hooks(self):
+        stats = GradingStats()
+        events = []
+        stats.add_hook(lambda event, payload: events.append((event, payload)))
+        with stats.timer('encode'):
+            pass
+        stats.record_fallback('encode', 'boom')
+        self.assertEqual(stats.snapshot()['stages']['encode']['count'], 1)
+        self.assertEqual([event for event, _ in events], ['stage', 'fallback'])
+        self.assertEqual(stats.counters['fallback_events'], 1)
+    
+    def test_prometheus_export(self):
+        stats = GradingStats()
+        stats.observe_stage('encode', 0.002)
+        stats.observe_stage('encode', 0.2)
+        stats.observe_batch(3)
+        text = stats.to_prometheus()
+        self.assertIn('grading_stage_seconds_bucket{stage="encode",le="0.005"} 1', text)
+        self.assertIn('grading_stage_seconds_bucket{stage="encode",le="+Inf"} 2', text)
+        self.assertIn('grading_stage_seconds_count{stage="encode"} 2', text)
+        self.assertIn('grading_encode_batch_size_bucket{le="4"} 1', text)
+        self.assertIn('grading_encode_calls_total 1', text)
+        self.assertIn('grading_texts_encoded_total 3', text)
+
+
+class TestGraderInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.reference = "The Earth orbits around the Sun."
+        self.students = ["The Earth revolves around the Sun.", "The Sun orbits the Earth.", "Earth goes around."]
+    
+    def test_batch_grading_records_stages_and_counters(self):
+        grader = GradingAssistant()
+        grader.model = StubModel()
+        grader.grade_multiple_responses(self.students, self.reference)
+        snapshot = json.loads(grader.stats.to_json())
+        self.assertEqual(set(snapshot['stages']), {'analyze', 'encode', 'assess'})
+        self.assertEqual(snapshot['counters']['encode_calls'], 2)
+        self.assertEqual(snapshot['counters']['texts_encoded'], 4)
+        self.assertEqual(snapshot['counters']['texts_graded'], 3)
+        self.assertEqual(snapshot['counters']['texts_analyzed'], 4)
+        self.assertGreater(snapshot['counters']['tokens_processed'], 0)
+    
+    def test_silent_fallback_is_recorded(self):
+        grader = GradingAssistant()
+        grader.model = FailingModel()
+        with mock.patch('builtins.print'):
+            grader.grade_multiple_responses(self.students, self.reference)
+        snapshot = grader.stats.snapshot()
+        self.assertFalse(grader.use_transformer)
+        self.assertEqual(snapshot['counters']['fallback_events'], 1)
+        self.assertEqual(snapshot['fallbacks'][0]['stage'], 'encode')
+        self.assertIn('CUDA out of memory', snapshot['fallbacks'][0]['reason'])
+        self.assertIn('lexical_similarity', snapshot['stages'])
+    
+    def test_collusion_fallback_is_recorded(self):
+        grader = GradingAssistant()
+        grader.model = FailingModel()
+        with mock.patch('builtins.print'):
+            find_similar_submissions(grader, self.students)
+        snapshot = grader.stats.snapshot()
+        self.assertFalse(grader.use_transformer)
+        self.assertEqual(snapshot['counters']['fallback_events'], 1)
+        self.assertEqual(snapshot['fallbacks'][0]['stage'], 'encode')
+    
+    def test_model_load_failure_is_recorded(self):
+        grading_assistant.clear_shared_models()
+        self.addCleanup(grading_assistant.clear_shared_models)
+        with mock.patch.object(grading_assistant, '_create_model', side_effect=OSError("offline")), \
+                mock.patch('builtins.print'):
+            grader = GradingAssistant(lazy=False)
+        self.assertIn('model_load', grader.stats.snapshot()['stages'])
+        self.assertEqual(grader.stats.snapshot()['fallbacks'][0]['stage'], 'model_load')
+
+if __name__ == '__main__':
+    unittest.main()
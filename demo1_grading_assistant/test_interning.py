@@ -0,0 +1,80 @@
+import random
+import unittest
+import numpy as np
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA
+from interning import InternedCorpus, TokenInterner
+from text_analysis import analyze_text
+
+class TestInterning(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.use_transformer = False
+        self.reference = "The Earth orbits around the Sun, and the Moon orbits the Earth."
+        self.answers = [
+            "The Earth revolves around the Sun.",
+            "Earth goes around the Sun in space! It takes a year to do so, roughly 365 days.",
+            "",
+            "   ",
+            "...",
+            "end.Next sentence",
+            "the the the EARTH earth",
+            " ".join(["word"] * 50) + "."
+        ]
+        rng = random.Random(7)
+        alphabet = "abcdeEARTH .,!?'-\n"
+        self.answers += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80))) for _ in range(200)]
+
+    def expected_matrix(self, answers, reference_answer):
+        reference = analyze_text(reference_answer)
+        rows = []
+        for answer in answers:
+            student = analyze_text(answer)
+            accuracy = self.grader._token_cosine_similarity(student.tokens, reference.tokens)
+            scores = self.grader._score_response(student, reference, accuracy)
+            rows.append([scores[criterion] for criterion in CRITERIA])
+        return rows
+
+    def test_scores_match_per_answer_analysis(self):
+        matrix = self.grader.score_matrix(self.answers, self.reference)
+        self.assertEqual(matrix.tolist(), self.expected_matrix(self.answers, self.reference))
+
+    def test_blank_and_punctuation_only_reference(self):
+        for reference in ["", "...", "Sun"]:
+            matrix = self.grader.score_matrix(self.answers[:8], reference)
+            self.assertEqual(matrix.tolist(), self.expected_matrix(self.answers[:8], reference), reference)
+
+    def test_statistics_match_text_features(self):
+        corpus = InternedCorpus.build(self.answers)
+        for row, answer in enumerate(self.answers):
+            features = analyze_text(answer)
+            self.assertEqual(corpus.token_counts[row], len(features.tokens))
+            self.assertEqual(corpus.sentence_counts[row], len(features.sentence_lengths))
+            self.assertEqual(corpus.sentence_words[row], sum(features.sentence_lengths))
+            self.assertEqual(corpus.word_counts[row], features.word_count)
+            self.assertEqual(corpus.has_punctuation[row], features.has_punctuation)
+            self.assertEqual(corpus.has_capital[row], features.has_capital)
+
+    def test_interner_shares_ids_across_corpora(self):
+        interner = TokenInterner()
+        first = InternedCorpus.build(["the sun", "the moon"], interner)
+        second = InternedCorpus.build(["moon and sun"], interner)
+        self.assertEqual(len(interner), 4)
+        self.assertEqual(first.ids.dtype, np.int32)
+        vocabulary = {token: token_id for token_id, token in enumerate(interner.ids)}
+        self.assertEqual(second.row_ids(0).tolist(), sorted(vocabulary[token] for token in ['moon', 'and', 'sun']))
+        self.assertEqual(second.overlap_counts(first.row_ids(1)).tolist(), [1.0])
+
+    def test_row_ids_are_sorted_and_distinct(self):
+        corpus = InternedCorpus.build(self.answers)
+        for row, answer in enumerate(self.answers):
+            ids = corpus.row_ids(row)
+            self.assertTrue(np.all(np.diff(ids) > 0))
+            self.assertEqual(len(ids), len(analyze_text(answer).token_set))
+
+    def test_empty_corpus(self):
+        self.assertEqual(len(InternedCorpus.build([])), 0)
+        self.assertEqual(self.grader.score_matrix([], self.reference).shape, (0, len(CRITERIA)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from grading_assistant import GradingAssistant
+from lexical import LexicalVectorizer, iter_pairwise_similarities, similarities_to_reference
+
+class TestLexicalEngine(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.use_transformer = False
+        self.reference = "The Earth orbits around the Sun, and the Moon orbits the Earth."
+        self.answers = [
+            "The Earth revolves around the Sun.",
+            "Earth goes around the Sun in space!",
+            "The Sun orbits the Earth.",
+            "",
+            "...",
+            "Photosynthesis converts light into chemical energy.",
+            "the the the EARTH earth"
+        ]
+    
+    def tokens(self, text):
+        return self.grader._preprocess_text(text)
+    
+    def test_matches_fallback_exactly(self):
+        similarities = similarities_to_reference(
+            [self.tokens(answer) for answer in self.answers], self.tokens(self.reference)
+        )
+        expected = [self.grader._cosine_similarity_fallback(answer, self.reference) for answer in self.answers]
+        self.assertEqual(similarities.tolist(), expected)
+    
+    def test_empty_reference(self):
+        similarities = similarities_to_reference([self.tokens(answer) for answer in self.answers], [])
+        self.assertEqual(similarities.tolist(), [0.0] * len(self.answers))
+    
+    def test_hashed_features_close_to_vocabulary(self):
+        token_lists = [self.tokens(answer) for answer in self.answers]
+        exact = similarities_to_reference(token_lists, self.tokens(self.reference))
+        hashed = similarities_to_reference(token_lists, self.tokens(self.reference), n_features=1 << 20)
+        np.testing.assert_allclose(hashed, exact, atol=1e-9)
+    
+    def test_grader_batch_fallback_matches_single_path(self):
+        batched = self.grader.calculate_similarities(self.answers, self.reference)
+        single = [self.grader.calculate_similarity(answer, self.reference) for answer in self.answers]
+        self.assertEqual(batched, single)
+    
+    def test_pairwise_blocks_match_fallback(self):
+        matrix = LexicalVectorizer().transform([self.tokens(answer) for answer in self.answers])
+        # Tiny limits force several row blocks and product chunks
+        blocks = list(iter_pairwise_similarities(matrix, block_size=3, max_products=4))
+        self.assertEqual([start for start, _ in blocks], [0, 3, 6])
+        full = np.vstack([block for _, block in blocks])
+        for i, first in enumerate(self.answers):
+            for j, second in enumerate(self.answers):
+                self.assertAlmostEqual(full[i, j], self.grader._cosine_similarity_fallback(first, second))
+
+if __name__ == '__main__':
+    unittest.main()
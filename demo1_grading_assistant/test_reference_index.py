@@ -0,0 +1,68 @@
+import unittest
+from grading_assistant import GradingAssistant
+from grading_results import CRITERIA
+from reference_index import ReferenceIndex
+from test_grading_assistant import StubModel
+
+QUESTION_BANK = {
+    'q1': ["The Earth orbits around the Sun once a year.",
+           "Our planet revolves about the Sun, completing one orbit annually."],
+    'q2': ["Plants make glucose from light, water and carbon dioxide."]
+}
+ANSWERS = [
+    ('q1', "The Earth revolves around the Sun."),
+    ('q2', "Plants use light to make sugar."),
+    ('q1', "Our planet revolves about the Sun, completing one orbit annually."),
+    ('q2', "Photosynthesis makes glucose from water and carbon dioxide using light.")
+]
+
+
+class TestReferenceIndex(unittest.TestCase):
+    def setUp(self):
+        self.grader = GradingAssistant()
+        self.grader.model = StubModel()
+    
+    def test_single_exemplar_matches_grade_multiple_responses(self):
+        for use_transformer in (True, False):
+            self.grader.use_transformer = use_transformer
+            index = ReferenceIndex(self.grader, {'q2': QUESTION_BANK['q2']})
+            answers = [answer for _, answer in ANSWERS]
+            results = index.grade(['q2'] * len(answers), answers)
+            expected = self.grader.grade_multiple_responses(answers, QUESTION_BANK['q2'][0])
+            for (grade, feedback, scores), (expected_grade, expected_feedback, expected_scores) in zip(results, expected):
+                self.assertEqual(grade, expected_grade)
+                self.assertEqual(feedback, expected_feedback)
+                for criterion in CRITERIA:
+                    self.assertAlmostEqual(scores[criterion], expected_scores[criterion], places=5)
+    
+    def test_best_exemplar_used(self):
+        index = ReferenceIndex(self.grader, QUESTION_BANK)
+        _, _, scores = index.grade(['q1'], [ANSWERS[2][1]])[0]
+        self.assertAlmostEqual(scores['content_accuracy'], 1.0, places=5)
+        self.assertAlmostEqual(scores['completeness'], 1.0, places=5)
+    
+    def test_top_k_mean(self):
+        best = ReferenceIndex(self.grader, QUESTION_BANK).grade(['q1'], [ANSWERS[2][1]])
+        mean = ReferenceIndex(self.grader, QUESTION_BANK, top_k=2).grade(['q1'], [ANSWERS[2][1]])
+        self.assertLess(mean.scores['content_accuracy'][0], best.scores['content_accuracy'][0])
+    
+    def test_exam_graded_in_one_encode_call(self):
+        index = ReferenceIndex(self.grader, QUESTION_BANK)
+        calls = self.grader.model.encode_calls
+        submissions = {
+            's1': {'q1': ANSWERS[0][1], 'q2': ANSWERS[1][1]},
+            's2': {'q1': ANSWERS[2][1], 'q2': ANSWERS[3][1]}
+        }
+        graded = index.grade_exam(submissions)
+        self.assertEqual(self.grader.model.encode_calls, calls + 1)
+        self.assertEqual(set(graded), {'s1', 's2'})
+        self.assertEqual(set(graded['s2']), {'q1', 'q2'})
+        self.assertEqual(graded['s2']['q1'], index.grade(['q1'], [ANSWERS[2][1]])[0])
+    
+    def test_unknown_question_rejected(self):
+        index = ReferenceIndex(self.grader, QUESTION_BANK)
+        with self.assertRaises(ValueError):
+            index.grade(['q3'], ["Anything"])
+
+if __name__ == '__main__':
+    unittest.main()
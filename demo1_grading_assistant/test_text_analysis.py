@@ -0,0 +1,56 @@
+import re
+import unittest
+from unittest import mock
+import interning
+from grading_assistant import GradingAssistant
+from text_analysis import TextFeatures, analyze_text, split_chunks, text_statistics
+
+SAMPLES = [
+    "",
+    "   \n\t ",
+    "The sky is blue",
+    "The sky is blue. It is also wide!",
+    "end.Next sentence here?! And... more",
+    "...!!!",
+    "no capitals and no terminal punctuation at all in this long answer",
+    "Ünïcode Wörds, with commas; and colons: done.",
+    "One. Two. Three. Four. Five. Six. Seven. Eight. Nine. Ten. Eleven."
+]
+
+
+class TestTextAnalysis(unittest.TestCase):
+    def test_features_match_original_regex_logic(self):
+        for text in SAMPLES:
+            features = analyze_text(text)
+            sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+            self.assertEqual(features.tokens, re.sub(r'[^\w\s]', '', text.lower()).split(), text)
+            self.assertEqual(features.sentence_lengths, tuple(len(s.split()) for s in sentences), text)
+            self.assertEqual(features.has_punctuation, bool(re.search(r'[.!?]', text)), text)
+            self.assertEqual(features.has_capital, bool(re.search(r'[A-Z]', text)), text)
+            self.assertEqual(features.word_count, len(text.split()), text)
+            self.assertEqual(features.is_blank, not text.strip(), text)
+    
+    def test_split_chunks(self):
+        self.assertEqual(split_chunks("A short answer.", 5), ["A short answer."])
+        text = "One two three. Four five six seven. " + " ".join(["word"] * 12) + ". End here."
+        chunks = split_chunks(text, 5)
+        self.assertTrue(all(len(chunk.split()) <= 5 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), text.split())
+        self.assertEqual(chunks[0], "One two three.")
+    
+    def test_record_is_compact(self):
+        self.assertFalse(hasattr(analyze_text("Some text."), '__dict__'))
+        self.assertIn('token_set', TextFeatures.__slots__)
+    
+    def test_reference_analyzed_once_per_batch(self):
+        grader = GradingAssistant()
+        grader.use_transformer = False
+        answers = ["The Earth revolves around the Sun.", "The Sun orbits the Earth.", "Earth goes around."]
+        with mock.patch.object(interning, 'text_statistics', wraps=text_statistics) as analyze:
+            results = grader.grade_multiple_responses(answers, "The Earth orbits around the Sun.")
+        self.assertEqual(analyze.call_count, len(answers) + 1)
+        for answer, result in zip(answers, results):
+            self.assertEqual(result, grader.grade_response(answer, "The Earth orbits around the Sun."))
+
+if __name__ == '__main__':
+    unittest.main()
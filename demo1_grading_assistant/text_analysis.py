@@ -0,0 +1,85 @@
+import re
+from typing import FrozenSet, List, Tuple
+
+# Compiled once and shared by every analysis
+_NON_WORD = re.compile(r'[^\w\s]')
+_SENTENCE_END = re.compile(r'[.!?]+')
+_CAPITAL = re.compile(r'[A-Z]')
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip punctuation and split into words"""
+    return _NON_WORD.sub('', text.lower()).split()
+
+
+class TextFeatures:
+    """Everything the criteria scorers need to know about one text"""
+
+    __slots__ = ('tokens', 'token_set', 'sentence_lengths', 'has_punctuation', 'has_capital', 'word_count')
+
+    def __init__(self,
+                 tokens: List[str],
+                 sentence_lengths: Tuple[int, ...],
+                 has_punctuation: bool,
+                 has_capital: bool,
+                 word_count: int):
+        self.tokens = tokens
+        self.token_set: FrozenSet[str] = frozenset(tokens)
+        self.sentence_lengths = sentence_lengths
+        self.has_punctuation = has_punctuation
+        self.has_capital = has_capital
+        self.word_count = word_count
+
+    @property
+    def is_blank(self) -> bool:
+        return self.word_count == 0
+
+
+def text_statistics(text: str) -> Tuple[Tuple[int, ...], bool, bool, int]:
+    """Sentence lengths, punctuation and capital flags, and word count of a text"""
+    parts = _SENTENCE_END.split(text)
+    # Empty sentences have no words, so dropping zero lengths matches
+    # filtering on s.strip() before counting
+    sentence_lengths = tuple(length for length in map(len, map(str.split, parts)) if length)
+    return (
+        sentence_lengths,
+        len(parts) > 1,
+        _CAPITAL.search(text) is not None,
+        # Without sentence breaks the only sentence already holds the word count
+        len(text.split()) if len(parts) > 1 else sum(sentence_lengths)
+    )
+
+
+def analyze_text(text: str) -> TextFeatures:
+    """Analyze a text once for tokens, sentence lengths and structural flags"""
+    sentence_lengths, has_punctuation, has_capital, word_count = text_statistics(text)
+    return TextFeatures(
+        tokens=tokenize(text),
+        sentence_lengths=sentence_lengths,
+        has_punctuation=has_punctuation,
+        has_capital=has_capital,
+        word_count=word_count
+    )
+
+def split_chunks(text: str, max_words: int) -> List[str]:
+    """Split text into chunks of at most max_words words, breaking between sentences where possible"""
+    words = text.split()
+    if len(words) <= max_words:
+        return [text]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    for sentence in _SENTENCE_BREAK.split(text.strip()):
+        sentence_words = sentence.split()
+        if current and len(current) + len(sentence_words) > max_words:
+            chunks.append(" ".join(current))
+            current = []
+        # A single over-long sentence is cut into fixed word windows
+        while len(sentence_words) > max_words:
+            chunks.append(" ".join(sentence_words[:max_words]))
+            sentence_words = sentence_words[max_words:]
+        current.extend(sentence_words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks